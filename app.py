@@ -1,6 +1,9 @@
+import atexit
 import os
 import json
 import asyncio
+import logging
+import logging.handlers
 import queue
 import threading
 from flask import Flask, request, jsonify
@@ -11,6 +14,17 @@ from states import UserStates
 
 app = Flask(__name__)
 
+# Неблокирующее логирование: записи складываются в очередь, отдельный поток
+# выгружает её в stderr — event loop не ждёт вывода
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+logging.basicConfig(
+    level=logging.INFO,
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
+)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 # Инициализация переменных окружения
 TOKEN = os.getenv('TELEGRAM_TOKEN')
 WEBHOOK_URL = "https://challange10k.onrender.com/webhook"
@@ -88,10 +102,19 @@ async def process_updates():
             
         await asyncio.sleep(0.01)  # Небольшая пауза
 
+# uvloop заметно ускоряет планирование задач и сокетный ввод-вывод;
+# если его нет (например, Windows), работаем на стандартном цикле
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    print("✅ uvloop enabled")
+except ImportError:
+    pass
+
 def run_bot():
     """Запуск бота в отдельном потоке"""
     global bot_loop
-    
+
     try:
         # Создаем новый event loop для бота
         bot_loop = asyncio.new_event_loop()
@@ -180,6 +203,7 @@ def shutdown_bot():
     if bot_loop and not bot_loop.is_closed():
         # Останавливаем приложение
         try:
+            asyncio.run_coroutine_threadsafe(bot_handlers.aclose(), bot_loop)
             asyncio.run_coroutine_threadsafe(application.stop(), bot_loop)
             asyncio.run_coroutine_threadsafe(application.shutdown(), bot_loop)
         except:
@@ -187,7 +211,6 @@ def shutdown_bot():
 
 # Обработка сигналов завершения
 import signal
-import atexit
 
 def signal_handler(signum, frame):
     shutdown_bot()
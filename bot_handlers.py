@@ -1,29 +1,314 @@
 import asyncio
+import logging
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from time import monotonic
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from states import BotState, UserStates
 from google_sheets import GoogleSheetsManager
 from utils import format_report_message
 
+log = logging.getLogger(__name__)
+
+# TTL-кэш чтений из Google Sheets: ключ включает номер «корзины» времени,
+# поэтому записи устаревают сами через _SHEETS_TTL секунд
+_SHEETS_TTL = 60
+
+@lru_cache(maxsize=256)
+def _cached_prev_tasks(manager, week_number, bucket):
+    return tuple(manager.get_previous_week_tasks(week_number))
+
+@lru_cache(maxsize=16)
+def _cached_week_numbers(manager, bucket):
+    return tuple(manager.get_all_week_numbers())
+
+def _clear_sheets_cache():
+    """Сбросить кэш чтений после записи или удаления отчёта"""
+    _cached_prev_tasks.cache_clear()
+    _cached_week_numbers.cache_clear()
+
+class _TokenBucket:
+    """Ограничитель исходящих запросов к Telegram (лимит бота ~30 сообщений/с)"""
+
+    def __init__(self, rate: int = 30):
+        self.rate = rate
+        self.tokens = float(rate)
+        self.updated = monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = monotonic()
+                self.tokens = min(float(self.rate), self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+# Числовые callback_data проверяются одним скомпилированным регулярным
+# выражением: некорректные данные отсекаются веткой, а не исключением
+_CB_NUM_RE = re.compile(
+    r"^(rating|task|priority|edit_task|edit_week|delete_week|confirm_delete)_(\d+)$"
+)
+
+# Сетка оценок 1..10 одинакова для всех пользователей — один объект на модуль
+_RATING_GRID = InlineKeyboardMarkup([
+    [InlineKeyboardButton(str(i), callback_data=f"rating_{i}") for i in range(1, 6)],
+    [InlineKeyboardButton(str(i), callback_data=f"rating_{i}") for i in range(6, 11)],
+    [InlineKeyboardButton("◀️ Назад", callback_data="back")]
+])
+
+# Шаблон предпросмотра при редактировании отчёта — создаётся один раз на модуль
+_EDIT_PREVIEW_TPL = """✏️ **РЕДАКТИРОВАНИЕ ОТЧЕТА ЗА НЕДЕЛЮ {week}**
+
+📊 **Текущие данные:**
+📅 Неделя: {week_number}
+⭐ Оценка: {rating}/10
+
+📋 **Выполненные задачи:**
+{completed}
+
+❌ **Невыполненные задачи:**
+{incomplete}
+
+🎯 **Планируемые задачи:**
+{planned}
+
+💬 **Комментарий:** {comment}
+
+Выберите, что хотите изменить:"""
+
 class BotHandlers:
     def __init__(self, user_states: UserStates):
         self.user_states = user_states
         self.sheets_manager = GoogleSheetsManager()
         self.sheet_url = "https://docs.google.com/spreadsheets/d/16RGrwyaPaW_FHHyvRS_gyjVaULrq3pWqe5fX7SZQjb8/edit?gid=1682234301#gid=1682234301"
+        # Отдельный пул для блокирующих вызовов Google Sheets: не конкурирует
+        # с общим executor'ом и ограничивает параллелизм ниже квот Google
+        self._sheets_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="sheets")
+        # Общий лимит исходящих запросов к Telegram на процесс
+        self._send_limiter = _TokenBucket(rate=30)
+        # Одновременные одинаковые чтения делят один запрос (single-flight)
+        self._inflight = {}
+        self._inflight_lock = asyncio.Lock()
+        # Идущие прямо сейчас сохранения (user_id, week_number) — защита от повторных нажатий
+        self._saves_in_flight = set()
+        # Очередь фоновых записей в Sheets: один worker выполняет их по
+        # порядку, давая естественный backpressure при всплесках
+        self._save_queue = asyncio.Queue()
+        self._save_worker = None
+        # Хэши последнего отправленного содержимого по (chat_id, message_id),
+        # чтобы не слать в Telegram идентичные правки (400 "message not modified")
+        self._last_edit = {}
+        # Статичные клавиатуры: содержимое не зависит от пользователя,
+        # поэтому собираем их один раз вместо пересоздания на каждый колбэк
+        self._kb_main_menu = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📝 Создать отчёт", callback_data="create_report")],
+            [InlineKeyboardButton("✏️ Изменить отчёт", callback_data="edit_existing_report")],
+            [InlineKeyboardButton("🗑️ Удалить отчёт", callback_data="delete_report")]
+        ])
+        self._kb_back_only = InlineKeyboardMarkup(
+            [[InlineKeyboardButton("◀️ Назад", callback_data="back")]]
+        )
+        self._kb_skip_back = InlineKeyboardMarkup([
+            [InlineKeyboardButton("⏭️ Пропустить", callback_data="next_step")],
+            [InlineKeyboardButton("◀️ Назад", callback_data="back")]
+        ])
+        self._kb_next_edit_back = InlineKeyboardMarkup([
+            [InlineKeyboardButton("➡️ Далее", callback_data="next_step")],
+            [InlineKeyboardButton("✏️ Изменить задачу", callback_data="edit_task")],
+            [InlineKeyboardButton("◀️ Назад", callback_data="back")]
+        ])
+        self._kb_add_more = InlineKeyboardMarkup([
+            [InlineKeyboardButton("➕ Добавить ещё", callback_data="add_more_tasks")],
+            [InlineKeyboardButton("➡️ Далее", callback_data="next_step")],
+            [InlineKeyboardButton("◀️ Назад", callback_data="back")]
+        ])
+        self._kb_post_save = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📝 Новый отчёт", callback_data="new_report")],
+            [InlineKeyboardButton("🗑️ Удалить отчёт", callback_data="delete_report")],
+            [InlineKeyboardButton("📊 Перейти в таблицу", url=self.sheet_url)]
+        ])
+        self._kb_post_delete = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📝 Новый отчёт", callback_data="new_report")],
+            [InlineKeyboardButton("🗑️ Удалить ещё отчёт", callback_data="delete_report")],
+            [InlineKeyboardButton("📊 Перейти в таблицу", url=self.sheet_url)]
+        ])
+        self._kb_edit_sections = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📅 Номер недели", callback_data="edit_week")],
+            [InlineKeyboardButton("⭐ Оценка", callback_data="edit_rating")],
+            [InlineKeyboardButton("✅ Выполненные задачи", callback_data="edit_completed")],
+            [InlineKeyboardButton("🎯 Планируемые задачи", callback_data="edit_planned")],
+            [InlineKeyboardButton("💬 Комментарий", callback_data="edit_comment")],
+            [InlineKeyboardButton("◀️ Назад", callback_data="back")]
+        ])
+        self._kb_confirm_preview = InlineKeyboardMarkup([
+            [InlineKeyboardButton("✅ Подтвердить", callback_data="confirm_report")],
+            [InlineKeyboardButton("✏️ Изменить", callback_data="edit_report")],
+            [InlineKeyboardButton("◀️ Назад", callback_data="back")]
+        ])
+        self._kb_edit_tasks = {
+            task_type: InlineKeyboardMarkup([
+                [InlineKeyboardButton("➕ Добавить задачу", callback_data=f"add_{task_type}_task")],
+                [InlineKeyboardButton("🗑️ Удалить задачу", callback_data=f"remove_{task_type}_task")],
+                [InlineKeyboardButton("◀️ Назад", callback_data="back")]
+            ])
+            for task_type in ("completed", "incomplete", "planned")
+        }
+        # Точные совпадения callback_data -> обработчик (O(1) вместо цепочки elif)
+        self._exact_dispatch = {
+            "create_report": self._start_report_creation,
+            "back": self._handle_back,
+            "new_report": self._start_report_creation,
+            "delete_report": self._handle_delete_report,
+            "edit_existing_report": self._handle_edit_existing_report,
+            "open_sheet": self._handle_open_sheet,
+            "add_more_tasks": self._handle_add_more_tasks,
+            "next_step": self._handle_next_step,
+            "edit_task": self._handle_edit_task,
+            "confirm_report": self._handle_confirm_report,
+            "edit_report": self._handle_edit_report,
+        }
+        # Интернированные ключи дают сравнение по указателю при поиске в dict
+        self._exact_dispatch = {sys.intern(k): v for k, v in self._exact_dispatch.items()}
+        # callback_data вида <префикс>_<число>: номер уже распарсен регэкспом
+        self._numeric_dispatch = {
+            "rating": self._handle_rating_selection,
+            "task": self._handle_task_selection,
+            "priority": self._handle_priority_selection,
+            "edit_task": self._handle_edit_specific_task,
+            "edit_week": self._handle_edit_week_selection,
+            "delete_week": self._handle_delete_week_selection,
+            "confirm_delete": self._handle_confirm_delete,
+        }
+        # Остальные префиксные callback_data
+        self._prefix_dispatch = (
+            ("edit_", self._handle_edit_section),
+        )
+        # Диспетчеризация текстовых сообщений по состоянию — один поиск в dict
+        self._msg_dispatch = {
+            BotState.WAITING_FOR_WEEK_NUMBER: self._handle_week_number,
+            BotState.ADDING_ADDITIONAL_TASKS: self._handle_additional_task,
+            BotState.ADDING_PLANNED_TASKS: self._handle_planned_task,
+            BotState.WAITING_FOR_COMMENT: self._handle_comment,
+            BotState.EDITING_TASK: self._handle_task_edit,
+        }
+        # Диспетчеризация секций редактирования отчёта
+        self._edit_section_handlers = {
+            "week": self._edit_section_week,
+            "rating": self._edit_section_rating,
+            "comment": self._edit_section_comment,
+            "completed": self._edit_section_completed,
+            "incomplete": self._edit_section_incomplete,
+            "planned": self._edit_section_planned,
+        }
+        # Диспетчеризация кнопки "Назад" по текущему состоянию;
+        # для неизвестного состояния возвращаемся в главное меню
+        self._back_table = {
+            BotState.WAITING_FOR_RATING: self._back_to_week_number,
+            BotState.SELECTING_COMPLETED_TASKS: self._back_to_rating,
+            BotState.ADDING_ADDITIONAL_TASKS: self._back_to_completed_tasks,
+            BotState.ADDING_PLANNED_TASKS: self._back_to_additional_tasks,
+            BotState.SELECTING_PRIORITY_TASK: self._back_to_planned_tasks,
+            BotState.WAITING_FOR_COMMENT: self._back_to_priority,
+            BotState.CONFIRMING_REPORT: self._back_to_comment,
+            BotState.CONFIRMING_DELETE: self._back_to_delete_list,
+        }
+
+    async def _single_flight(self, key, fn, *args):
+        """Выполнить блокирующий вызов в пуле, разделяя результат между
+        одновременными запросами с одинаковым ключом"""
+        async with self._inflight_lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                return await fut
+            fut = asyncio.get_running_loop().create_future()
+            self._inflight[key] = fut
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._sheets_pool, fn, *args
+            )
+            fut.set_result(result)
+            return result
+        except Exception as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            async with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _enqueue_write(self, coro):
+        """Поставить фоновую запись в очередь, запустив worker при необходимости"""
+        if self._save_worker is None or self._save_worker.done():
+            self._save_worker = asyncio.create_task(self._write_worker())
+        self._save_queue.put_nowait(coro)
+
+    async def _write_worker(self):
+        """Выполнять записи в Sheets последовательно из очереди"""
+        while True:
+            coro = await self._save_queue.get()
+            try:
+                await coro
+            except Exception:
+                log.exception("Error in write worker")
+            finally:
+                self._save_queue.task_done()
+
+    async def aclose(self):
+        """Освободить ресурсы при остановке бота"""
+        if self._save_worker is not None:
+            # Даём очереди дозаписаться, чтобы не потерять отчёты
+            await self._save_queue.join()
+            self._save_worker.cancel()
+        self._sheets_pool.shutdown(wait=False)
+
+    async def _safe_reply(self, message, text, reply_markup=None, parse_mode=None):
+        """reply_text через общий ограничитель исходящих запросов"""
+        await self._send_limiter.acquire()
+        await message.reply_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
+
+    async def _edit_markup(self, query, reply_markup):
+        """Точечная замена клавиатуры с инвалидацией хэша последней правки
+
+        Текст сообщения после такой правки нам неизвестен, поэтому
+        запомненный хэш сбрасывается — следующий _safe_edit перерисует."""
+        await self._send_limiter.acquire()
+        await query.edit_message_reply_markup(reply_markup=reply_markup)
+        message = getattr(query, 'message', None)
+        if message is not None:
+            self._last_edit.pop((message.chat_id, message.message_id), None)
+
+    async def _safe_edit(self, query, text, reply_markup=None, parse_mode=None):
+        """edit_message_text, пропускающий правку, если содержимое не изменилось"""
+        message = getattr(query, 'message', None)
+        key = (message.chat_id, message.message_id) if message else None
+        content_hash = hash((
+            text,
+            reply_markup.to_json() if reply_markup else None,
+            parse_mode
+        ))
+        if key is not None and self._last_edit.get(key) == content_hash:
+            return
+        await self._send_limiter.acquire()
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
+        if key is not None:
+            if len(self._last_edit) > 4096:
+                self._last_edit.clear()
+            self._last_edit[key] = content_hash
     
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /start"""
         user_id = update.effective_user.id
         self.user_states.reset_user_data(user_id)
         
-        keyboard = [
-            [InlineKeyboardButton("📝 Создать отчёт", callback_data="create_report")],
-            [InlineKeyboardButton("✏️ Изменить отчёт", callback_data="edit_existing_report")],
-            [InlineKeyboardButton("🗑️ Удалить отчёт", callback_data="delete_report")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = self._kb_main_menu
         
-        await update.message.reply_text(
+        await self._safe_reply(update.message, 
             "🤖 Привет! Я помогу создать еженедельный отчёт.\n\n"
             "📊 Выберите действие:",
             reply_markup=reply_markup
@@ -36,200 +321,160 @@ class BotHandlers:
         
         user_id = query.from_user.id
         user_data = self.user_states.get_user_data(user_id)
-        data = query.data
+        # Интернированная строка ищется в интернированных ключах dispatch-dict
+        # сравнением указателей (хэш у интернированных строк закэширован)
+        data = sys.intern(query.data)
         
         try:
-            if data == "create_report":
-                await self._start_report_creation(query, user_id)
-            elif data == "back":
-                await self._handle_back(query, user_id)
-            elif data == "new_report":
-                await self._start_report_creation(query, user_id)
-            elif data == "delete_report":
-                await self._handle_delete_report(query, user_id)
-            elif data == "edit_existing_report":
-                await self._handle_edit_existing_report(query, user_id)
-            elif data == "open_sheet":
-                await self._handle_open_sheet(query, user_id)
-            elif data.startswith("delete_week_"):
-                await self._handle_delete_week_selection(query, user_id, data)
-            elif data.startswith("edit_week_"):
-                await self._handle_edit_week_selection(query, user_id, data)
-            elif data.startswith("confirm_delete_"):
-                await self._handle_confirm_delete(query, user_id, data)
-            elif data.startswith("rating_"):
-                await self._handle_rating_selection(query, user_id, data)
-            elif data.startswith("task_"):
-                await self._handle_task_selection(query, user_id, data)
-            elif data == "add_more_tasks":
-                await self._handle_add_more_tasks(query, user_id)
-            elif data == "next_step":
-                await self._handle_next_step(query, user_id)
-            elif data == "edit_task":
-                await self._handle_edit_task(query, user_id)
-            elif data.startswith("edit_task_"):
-                await self._handle_edit_specific_task(query, user_id, data)
-            elif data.startswith("priority_"):
-                await self._handle_priority_selection(query, user_id, data)
-            elif data == "confirm_report":
-                await self._handle_confirm_report(query, user_id)
-            elif data == "edit_report":
-                await self._handle_edit_report(query, user_id)
-            elif data.startswith("edit_"):
-                await self._handle_edit_section(query, user_id, data)
-            elif data.startswith("add_") and data.endswith("_task"):
-                await self._handle_add_task_for_edit(query, user_id, data)
-            elif data.startswith("remove_") and data.endswith("_task"):
-                await self._handle_remove_task_for_edit(query, user_id, data)
-            elif data.startswith("remove_") and "_task_" in data:
-                await self._handle_specific_task_removal(query, user_id, data)
+            handler = self._exact_dispatch.get(data)
+            if handler:
+                await handler(query, user_id, user_data)
+                return
+            m = _CB_NUM_RE.match(data)
+            if m:
+                await self._numeric_dispatch[m.group(1)](query, user_id, int(m.group(2)), user_data)
+            else:
+                for prefix, prefix_handler in self._prefix_dispatch:
+                    if data.startswith(prefix):
+                        await prefix_handler(query, user_id, data, user_data)
+                        break
+                else:
+                    if data.startswith("add_") and data.endswith("_task"):
+                        await self._handle_add_task_for_edit(query, user_id, data, user_data)
+                    elif data.startswith("remove_") and data.endswith("_task"):
+                        await self._handle_remove_task_for_edit(query, user_id, data, user_data)
+                    elif data.startswith("remove_") and "_task_" in data:
+                        await self._handle_specific_task_removal(query, user_id, data, user_data)
         except Exception as e:
-            print(f"Error in button_handler: {e}")
-            await query.edit_message_text("❌ Произошла ошибка. Попробуйте ещё раз.")
+            log.exception("Error in button_handler")
+            await self._safe_edit(query, "❌ Произошла ошибка. Попробуйте ещё раз.")
+        finally:
+            # Фиксируем состояние на диске, чтобы перезапуск не терял прогресс
+            self.user_states.flush(user_id)
     
-    async def _handle_back(self, query, user_id):
+    async def _handle_back(self, query, user_id, user_data):
         """Обработка кнопки Назад"""
-        user_data = self.user_states.get_user_data(user_id)
-        current_state = user_data.state
-        
-        if current_state == BotState.WAITING_FOR_RATING:
-            await self._start_report_creation(query, user_id)
-        elif current_state == BotState.SELECTING_COMPLETED_TASKS:
-            # Возвращаемся к выбору оценки недели
-            self.user_states.set_state(user_id, BotState.WAITING_FOR_RATING)
-            
-            keyboard = []
-            row = []
-            for i in range(1, 11):
-                row.append(InlineKeyboardButton(str(i), callback_data=f"rating_{i}"))
-                if len(row) == 5:
-                    keyboard.append(row)
-                    row = []
-            if row:
-                keyboard.append(row)
-            keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data="back")])
-            
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.edit_message_text(
-                f"📅 Неделя {user_data.week_number}\n\n⭐ Оцените неделю от 1 до 10:",
-                reply_markup=reply_markup
-            )
-        elif current_state == BotState.ADDING_ADDITIONAL_TASKS:
-            if user_data.previous_planned_tasks:
-                await self._show_completed_tasks_selection(query, user_id)
-            else:
-                await self._handle_rating_selection(query, user_id, f"rating_{user_data.rating}")
-        elif current_state == BotState.ADDING_PLANNED_TASKS:
-            self.user_states.set_state(user_id, BotState.ADDING_ADDITIONAL_TASKS)
-            keyboard = [[InlineKeyboardButton("⏭️ Пропустить", callback_data="next_step")],
-                       [InlineKeyboardButton("◀️ Назад", callback_data="back")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.edit_message_text("➕ Что ещё было сделано? (по одной задаче):", reply_markup=reply_markup)
-        elif current_state == BotState.SELECTING_PRIORITY_TASK:
-            self.user_states.set_state(user_id, BotState.ADDING_PLANNED_TASKS)
-            keyboard = [
-                [InlineKeyboardButton("⏭️ Пропустить", callback_data="next_step")],
-                [InlineKeyboardButton("◀️ Назад", callback_data="back")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.edit_message_text("🎯 Что запланировано на следующую неделю?", reply_markup=reply_markup)
-        elif current_state == BotState.WAITING_FOR_COMMENT:
-            if user_data.planned_tasks:
-                await self._select_priority_task(query, user_id)
-            else:
-                self.user_states.set_state(user_id, BotState.ADDING_PLANNED_TASKS)
-                keyboard = [
-                    [InlineKeyboardButton("⏭️ Пропустить", callback_data="next_step")],
-                    [InlineKeyboardButton("◀️ Назад", callback_data="back")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                await query.edit_message_text("🎯 Что запланировано на следующую неделю?", reply_markup=reply_markup)
-        elif current_state == BotState.CONFIRMING_REPORT:
-            self.user_states.set_state(user_id, BotState.WAITING_FOR_COMMENT)
-            keyboard = [[InlineKeyboardButton("◀️ Назад", callback_data="back")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.edit_message_text("💬 Добавьте комментарий к отчёту:", reply_markup=reply_markup)
-        elif current_state == BotState.EDITING_REPORT:
-            # Возврат к главному меню из режима редактирования
-            await self._show_main_menu(query, user_id)
-        elif current_state == BotState.DELETING_REPORT:
-            await self._show_main_menu(query, user_id)
-        elif current_state == BotState.CONFIRMING_DELETE:
-            await self._handle_delete_report(query, user_id)
+        handler = self._back_table.get(user_data.state, self._back_to_main_menu)
+        await handler(query, user_id, user_data)
+
+    async def _back_to_main_menu(self, query, user_id, user_data):
+        await self._show_main_menu(query, user_id)
+
+    async def _back_to_week_number(self, query, user_id, user_data):
+        await self._start_report_creation(query, user_id, user_data)
+
+    async def _back_to_rating(self, query, user_id, user_data):
+        # Возвращаемся к выбору оценки недели
+        self.user_states.set_state(user_id, BotState.WAITING_FOR_RATING)
+
+        reply_markup = _RATING_GRID
+        await self._safe_edit(query, 
+            f"📅 Неделя {user_data.week_number}\n\n⭐ Оцените неделю от 1 до 10:",
+            reply_markup=reply_markup
+        )
+
+    async def _back_to_completed_tasks(self, query, user_id, user_data):
+        if user_data.previous_planned_tasks:
+            await self._show_completed_tasks_selection(query, user_id, user_data)
         else:
-            await self._show_main_menu(query, user_id)
+            await self._handle_rating_selection(query, user_id, user_data.rating, user_data)
+
+    async def _back_to_additional_tasks(self, query, user_id, user_data):
+        self.user_states.set_state(user_id, BotState.ADDING_ADDITIONAL_TASKS)
+        reply_markup = self._kb_skip_back
+        await self._safe_edit(query, "➕ Что ещё было сделано? (по одной задаче):", reply_markup=reply_markup)
+
+    async def _back_to_planned_tasks(self, query, user_id, user_data):
+        self.user_states.set_state(user_id, BotState.ADDING_PLANNED_TASKS)
+        reply_markup = self._kb_skip_back
+        await self._safe_edit(query, "🎯 Что запланировано на следующую неделю?", reply_markup=reply_markup)
+
+    async def _back_to_priority(self, query, user_id, user_data):
+        if user_data.planned_tasks:
+            await self._select_priority_task(query, user_id, user_data)
+        else:
+            await self._back_to_planned_tasks(query, user_id, user_data)
+
+    async def _back_to_comment(self, query, user_id, user_data):
+        self.user_states.set_state(user_id, BotState.WAITING_FOR_COMMENT)
+        reply_markup = self._kb_back_only
+        await self._safe_edit(query, "💬 Добавьте комментарий к отчёту:", reply_markup=reply_markup)
+
+    async def _back_to_delete_list(self, query, user_id, user_data):
+        await self._handle_delete_report(query, user_id, user_data)
     
     async def _show_main_menu(self, query, user_id):
         """Показать главное меню"""
-        keyboard = [
-            [InlineKeyboardButton("📝 Создать отчёт", callback_data="create_report")],
-            [InlineKeyboardButton("✏️ Изменить отчёт", callback_data="edit_existing_report")],
-            [InlineKeyboardButton("🗑️ Удалить отчёт", callback_data="delete_report")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(
+        reply_markup = self._kb_main_menu
+        await self._safe_edit(
+            query,
             "🤖 Главное меню\n\n📊 Выберите действие:",
             reply_markup=reply_markup
         )
     
-    async def _start_report_creation(self, query, user_id):
+    async def _start_report_creation(self, query, user_id, user_data):
         """Начать создание отчёта"""
         self.user_states.reset_user_data(user_id)
         self.user_states.set_state(user_id, BotState.WAITING_FOR_WEEK_NUMBER)
         
-        keyboard = [[InlineKeyboardButton("◀️ Назад", callback_data="back")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = self._kb_back_only
         
-        await query.edit_message_text(
+        await self._safe_edit(query, 
             "📅 Введите номер недели для отчёта:",
             reply_markup=reply_markup
         )
     
-    async def _show_completed_tasks_selection(self, query, user_id):
+    async def _show_completed_tasks_selection(self, query, user_id, user_data):
         """Показать выбор выполненных задач"""
-        user_data = self.user_states.get_user_data(user_id)
         
         keyboard = []
         for i, task in enumerate(user_data.previous_planned_tasks):
-            status = "✅" if task in user_data.completed_tasks else "❌"
+            status = "✅" if task in user_data.completed_tasks_set else "❌"
             keyboard.append([InlineKeyboardButton(f"{status} {task}", callback_data=f"task_{i}")])
         
         keyboard.append([InlineKeyboardButton("➡️ Далее", callback_data="next_step")])
         keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data="back")])
+        user_data.last_task_keyboard = keyboard
         
         reply_markup = InlineKeyboardMarkup(keyboard)
         self.user_states.set_state(user_id, BotState.SELECTING_COMPLETED_TASKS)
         
-        await query.edit_message_text(
+        await self._safe_edit(
+            query,
             f"⭐ Оценка недели: {user_data.rating}/10\n\n"
             "📋 Вот задачи за прошедшую неделю. Нажмите на выполненные:",
             reply_markup=reply_markup
         )
     
-    async def _handle_rating_selection(self, query, user_id, data):
+    async def _handle_rating_selection(self, query, user_id, rating, user_data):
         """Обработка выбора оценки"""
         try:
-            rating = int(data.split("_")[1])
-            user_data = self.user_states.get_user_data(user_id)
             user_data.rating = rating
+            user_data.mark_dirty()
             
             # Получаем задачи из предыдущей недели
-            prev_tasks = await asyncio.get_event_loop().run_in_executor(
-                None, self.sheets_manager.get_previous_week_tasks, user_data.week_number
+            prev_tasks = await self._single_flight(
+                ("prev", user_data.week_number),
+                _cached_prev_tasks, self.sheets_manager,
+                user_data.week_number, int(monotonic() // _SHEETS_TTL)
             )
-            user_data.previous_planned_tasks = prev_tasks
+            user_data.previous_planned_tasks = list(prev_tasks)
+            user_data.previous_planned_set = set(prev_tasks)
             
             if prev_tasks:
-                await self._show_completed_tasks_selection(query, user_id)
+                await self._show_completed_tasks_selection(query, user_id, user_data)
             else:
                 self.user_states.set_state(user_id, BotState.ADDING_ADDITIONAL_TASKS)
-                keyboard = [
-                    [InlineKeyboardButton("⏭️ Пропустить", callback_data="next_step")],
-                    [InlineKeyboardButton("◀️ Назад", callback_data="back")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
+                reply_markup = self._kb_skip_back
                 
-                # Получаем детальную диагностику
+                # Повторяем поиск с диагностикой в пуле Sheets: кэш индекса
+                # мог истечь, и тогда вызов ходит в API — не на event loop
+                await asyncio.get_running_loop().run_in_executor(
+                    self._sheets_pool,
+                    lambda: self.sheets_manager.get_previous_week_tasks(
+                        user_data.week_number, debug=True
+                    )
+                )
                 debug_summary = self.sheets_manager.get_last_debug_summary()
                 
                 message_text = f"⭐ Оценка недели: {rating}/10\n\n" \
@@ -240,91 +485,96 @@ class BotHandlers:
                               f"ТОЧНО отсутствуют в таблице.\n\n" \
                               f"{debug_summary}"
                 
-                await query.edit_message_text(
+                await self._safe_edit(query, 
                     message_text,
                     reply_markup=reply_markup
                 )
         except Exception as e:
-            print(f"Error in rating selection: {e}")
-            await query.edit_message_text("❌ Ошибка при выборе оценки. Попробуйте ещё раз.")
+            log.exception("Error in rating selection")
+            await self._safe_edit(query, "❌ Ошибка при выборе оценки. Попробуйте ещё раз.")
     
-    async def _handle_task_selection(self, query, user_id, data):
+    async def _handle_task_selection(self, query, user_id, task_index, user_data):
         """Обработка выбора задач"""
         try:
-            task_index = int(data.split("_")[1])
-            user_data = self.user_states.get_user_data(user_id)
             
             if task_index < len(user_data.previous_planned_tasks):
                 task = user_data.previous_planned_tasks[task_index]
                 
-                if task in user_data.completed_tasks:
+                if task in user_data.completed_tasks_set:
+                    user_data.completed_tasks_set.discard(task)
                     user_data.completed_tasks.remove(task)
-                    if task not in user_data.incomplete_tasks:
+                    if task not in user_data.incomplete_tasks_set:
+                        user_data.incomplete_tasks_set.add(task)
                         user_data.incomplete_tasks.append(task)
                 else:
-                    if task in user_data.incomplete_tasks:
+                    if task in user_data.incomplete_tasks_set:
+                        user_data.incomplete_tasks_set.discard(task)
                         user_data.incomplete_tasks.remove(task)
+                    user_data.completed_tasks_set.add(task)
                     user_data.completed_tasks.append(task)
+                user_data.mark_dirty()
                 
-                # Обновляем кнопки
-                await self._show_completed_tasks_selection(query, user_id)
+                # Обновляем только перещёлкнутую кнопку: edit_message_reply_markup
+                # шлёт в Telegram одну клавиатуру вместо текста с клавиатурой
+                keyboard = user_data.last_task_keyboard
+                if keyboard is not None and task_index < len(keyboard):
+                    status = "✅" if task in user_data.completed_tasks_set else "❌"
+                    keyboard[task_index][0] = InlineKeyboardButton(
+                        f"{status} {task}", callback_data=f"task_{task_index}"
+                    )
+                    await self._edit_markup(
+                        query, InlineKeyboardMarkup(keyboard)
+                    )
+                else:
+                    # Первая отрисовка или потерянная клавиатура — полная перерисовка
+                    await self._show_completed_tasks_selection(query, user_id, user_data)
         except Exception as e:
-            print(f"Error in task selection: {e}")
+            log.exception("Error in task selection")
     
-    async def _handle_next_step(self, query, user_id):
+    async def _handle_next_step(self, query, user_id, user_data):
         """Переход к следующему шагу"""
         try:
-            user_data = self.user_states.get_user_data(user_id)
             
             if user_data.state == BotState.SELECTING_COMPLETED_TASKS:
                 # Автоматически формируем список невыполненных задач из незавершенных планов
-                user_data.incomplete_tasks = []
-                for task in user_data.previous_planned_tasks:
-                    if task not in user_data.completed_tasks:
-                        user_data.incomplete_tasks.append(task)
+                user_data.incomplete_tasks = [
+                    task for task in user_data.previous_planned_tasks
+                    if task not in user_data.completed_tasks_set
+                ]
+                user_data.incomplete_tasks_set = set(user_data.incomplete_tasks)
+                user_data.mark_dirty()
                 
                 self.user_states.set_state(user_id, BotState.ADDING_ADDITIONAL_TASKS)
-                keyboard = [
-                    [InlineKeyboardButton("⏭️ Пропустить", callback_data="next_step")],
-                    [InlineKeyboardButton("◀️ Назад", callback_data="back")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
+                reply_markup = self._kb_skip_back
                 
-                await query.edit_message_text(
+                await self._safe_edit(query, 
                     "➕ Что ещё было сделано? (по одной задаче):",
                     reply_markup=reply_markup
                 )
             elif user_data.state == BotState.ADDING_ADDITIONAL_TASKS:
                 self.user_states.set_state(user_id, BotState.ADDING_PLANNED_TASKS)
-                keyboard = [
-                    [InlineKeyboardButton("⏭️ Пропустить", callback_data="next_step")],
-                    [InlineKeyboardButton("◀️ Назад", callback_data="back")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                await query.edit_message_text(
+                reply_markup = self._kb_skip_back
+                await self._safe_edit(query, 
                     "🎯 Что запланировано на следующую неделю?",
                     reply_markup=reply_markup
                 )
             elif user_data.state == BotState.ADDING_PLANNED_TASKS:
                 if user_data.planned_tasks:
-                    await self._select_priority_task(query, user_id)
+                    await self._select_priority_task(query, user_id, user_data)
                 else:
                     self.user_states.set_state(user_id, BotState.WAITING_FOR_COMMENT)
-                    keyboard = [[InlineKeyboardButton("◀️ Назад", callback_data="back")]]
-                    reply_markup = InlineKeyboardMarkup(keyboard)
-                    await query.edit_message_text("💬 Добавьте комментарий к отчёту:", reply_markup=reply_markup)
+                    reply_markup = self._kb_back_only
+                    await self._safe_edit(query, "💬 Добавьте комментарий к отчёту:", reply_markup=reply_markup)
             elif user_data.state == BotState.SELECTING_PRIORITY_TASK:
                 self.user_states.set_state(user_id, BotState.WAITING_FOR_COMMENT)
-                keyboard = [[InlineKeyboardButton("◀️ Назад", callback_data="back")]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                await query.edit_message_text("💬 Добавьте комментарий к отчёту:", reply_markup=reply_markup)
+                reply_markup = self._kb_back_only
+                await self._safe_edit(query, "💬 Добавьте комментарий к отчёту:", reply_markup=reply_markup)
         except Exception as e:
-            print(f"Error in next step: {e}")
+            log.exception("Error in next step")
     
-    async def _select_priority_task(self, query, user_id):
+    async def _select_priority_task(self, query, user_id, user_data):
         """Выбор приоритетной задачи"""
         try:
-            user_data = self.user_states.get_user_data(user_id)
             
             keyboard = []
             for i, task in enumerate(user_data.planned_tasks):
@@ -335,78 +585,100 @@ class BotHandlers:
             reply_markup = InlineKeyboardMarkup(keyboard)
             self.user_states.set_state(user_id, BotState.SELECTING_PRIORITY_TASK)
             
-            await query.edit_message_text(
+            await self._safe_edit(query, 
                 "⭐ Выберите приоритетную задачу:",
                 reply_markup=reply_markup
             )
         except Exception as e:
-            print(f"Error in priority selection: {e}")
+            log.exception("Error in priority selection")
     
-    async def _handle_priority_selection(self, query, user_id, data):
+    async def _handle_priority_selection(self, query, user_id, task_index, user_data):
         """Обработка выбора приоритетной задачи"""
         try:
-            task_index = int(data.split("_")[1])
-            user_data = self.user_states.get_user_data(user_id)
             
             if task_index < len(user_data.planned_tasks):
                 user_data.priority_task = user_data.planned_tasks[task_index]
+                user_data.mark_dirty()
             
             self.user_states.set_state(user_id, BotState.WAITING_FOR_COMMENT)
-            keyboard = [[InlineKeyboardButton("◀️ Назад", callback_data="back")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.edit_message_text("💬 Добавьте комментарий к отчёту:", reply_markup=reply_markup)
+            reply_markup = self._kb_back_only
+            await self._safe_edit(query, "💬 Добавьте комментарий к отчёту:", reply_markup=reply_markup)
         except Exception as e:
-            print(f"Error in priority selection: {e}")
+            log.exception("Error in priority selection")
     
-    async def _handle_confirm_report(self, query, user_id):
+    async def _handle_confirm_report(self, query, user_id, user_data):
         """Подтверждение отчёта"""
         try:
-            user_data = self.user_states.get_user_data(user_id)
-            
-            # Сохраняем в Google Sheets асинхронно
-            success = await asyncio.get_event_loop().run_in_executor(
-                None, self.sheets_manager.save_report,
-                user_data.week_number, user_data.completed_tasks,
-                user_data.incomplete_tasks, user_data.planned_tasks,
-                user_data.comment, user_data.rating
-            )
-            
-            if success:
-                # Отправляем чистый отчёт
-                report_text = format_report_message(user_data)
-                await query.edit_message_text(report_text)
-                
-                # Отправляем отдельное сообщение с кнопками
-                keyboard = [
-                    [InlineKeyboardButton("📝 Новый отчёт", callback_data="new_report")],
-                    [InlineKeyboardButton("🗑️ Удалить отчёт", callback_data="delete_report")],
-                    [InlineKeyboardButton("📊 Перейти в таблицу", url=self.sheet_url)]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                await query.message.reply_text(
-                    "✅ Отчёт успешно сохранён!\n\n"
-                    "Выберите следующее действие:",
-                    reply_markup=reply_markup
+
+            # Повторное нажатие «Подтвердить» во время сохранения не создаёт второй запрос
+            save_key = (user_id, user_data.week_number)
+            if save_key in self._saves_in_flight:
+                return
+            self._saves_in_flight.add(save_key)
+
+            try:
+                # Мгновенный отклик пользователю; запись в Sheets идёт в фоне
+                await self._safe_edit(query, "⏳ Сохраняю отчёт…")
+                self._enqueue_write(self._finalize_save(query, user_id, user_data, save_key))
+            except Exception:
+                # Запись не встала в очередь — ключ обязан освободиться,
+                # иначе подтверждение этой недели молча блокируется до рестарта
+                self._saves_in_flight.discard(save_key)
+                raise
+        except Exception as e:
+            log.exception("Error confirming report")
+            await self._safe_edit(query, "❌ Ошибка при сохранении отчёта.")
+
+    async def _finalize_save(self, query, user_id, user_data, save_key):
+        """Фоновая запись отчёта в Sheets и итоговое сообщение пользователю"""
+        try:
+            try:
+                success = await asyncio.get_running_loop().run_in_executor(
+                    self._sheets_pool, self.sheets_manager.save_report,
+                    user_data.week_number, user_data.completed_tasks,
+                    user_data.incomplete_tasks, user_data.planned_tasks,
+                    user_data.comment, user_data.rating
                 )
-                
+            finally:
+                self._saves_in_flight.discard(save_key)
+
+            if success:
+                _clear_sheets_cache()
+                # Отправляем чистый отчёт; текст уже собран на этапе превью
+                report_text = user_data.cached_report_text or format_report_message(user_data)
+
+                # Правка сообщения и отправка кнопок независимы —
+                # выполняем оба запроса к Telegram параллельно
+                async with asyncio.TaskGroup() as tg:
+                    tg.create_task(self._safe_edit(query, report_text))
+                    tg.create_task(self._safe_reply(query.message, 
+                        "✅ Отчёт успешно сохранён!\n\n"
+                        "Выберите следующее действие:",
+                        reply_markup=self._kb_post_save
+                    ))
+
                 self.user_states.reset_user_data(user_id)
+                self.user_states.flush(user_id)
             else:
-                await query.edit_message_text("❌ Ошибка сохранения. Попробуйте ещё раз.")
+                await self._safe_edit(query, "❌ Ошибка сохранения. Попробуйте ещё раз.")
         except Exception as e:
-            print(f"Error confirming report: {e}")
-            await query.edit_message_text("❌ Ошибка при сохранении отчёта.")
+            log.exception("Error finalizing save")
+            try:
+                await self._safe_edit(query, "❌ Ошибка при сохранении отчёта.")
+            except Exception:
+                pass
     
-    async def _handle_delete_report(self, query, user_id):
+    async def _handle_delete_report(self, query, user_id, user_data):
         """Обработка удаления отчёта"""
         try:
             # Получаем все номера недель
-            week_numbers = await asyncio.get_event_loop().run_in_executor(
-                None, self.sheets_manager.get_all_week_numbers
+            week_numbers = await self._single_flight(
+                ("weeks",), _cached_week_numbers, self.sheets_manager,
+                int(monotonic() // _SHEETS_TTL)
             )
             
             if not week_numbers:
-                await query.edit_message_text(
+                await self._safe_edit(query, 
                     "📄 Нет отчётов для удаления.\n\n"
                     "Создайте первый отчёт!",
                     reply_markup=InlineKeyboardMarkup([
@@ -423,19 +695,17 @@ class BotHandlers:
             reply_markup = InlineKeyboardMarkup(keyboard)
             self.user_states.set_state(user_id, BotState.DELETING_REPORT)
             
-            await query.edit_message_text(
+            await self._safe_edit(query, 
                 "🗑️ Выберите неделю для удаления:",
                 reply_markup=reply_markup
             )
         except Exception as e:
-            print(f"Error in delete report: {e}")
-            await query.edit_message_text("❌ Ошибка при получении списка отчётов.")
+            log.exception("Error in delete report")
+            await self._safe_edit(query, "❌ Ошибка при получении списка отчётов.")
     
-    async def _handle_delete_week_selection(self, query, user_id, data):
+    async def _handle_delete_week_selection(self, query, user_id, week_number, user_data):
         """Обработка выбора недели для удаления"""
         try:
-            week_number = int(data.split("_")[2])
-            user_data = self.user_states.get_user_data(user_id)
             user_data.delete_week_number = week_number
             
             keyboard = [
@@ -445,83 +715,82 @@ class BotHandlers:
             reply_markup = InlineKeyboardMarkup(keyboard)
             self.user_states.set_state(user_id, BotState.CONFIRMING_DELETE)
             
-            await query.edit_message_text(
+            await self._safe_edit(query, 
                 f"⚠️ Вы уверены, что хотите удалить отчёт за неделю {week_number}?\n\n"
                 "Это действие нельзя отменить!",
                 reply_markup=reply_markup
             )
         except Exception as e:
-            print(f"Error in delete week selection: {e}")
+            log.exception("Error in delete week selection")
     
-    async def _handle_confirm_delete(self, query, user_id, data):
+    async def _handle_confirm_delete(self, query, user_id, week_number, user_data):
         """Подтверждение удаления"""
         try:
-            week_number = int(data.split("_")[2])
-            
-            # Удаляем отчёт
-            success = await asyncio.get_event_loop().run_in_executor(
-                None, self.sheets_manager.delete_week_report, week_number
+
+            # Мгновенный отклик; удаление выполняется в фоне
+            await self._safe_edit(query, "⏳ Удаляю отчёт…")
+            self._enqueue_write(self._finalize_delete(query, user_id, week_number))
+        except Exception as e:
+            log.exception("Error confirming delete")
+            await self._safe_edit(query, "❌ Ошибка при удалении отчёта.")
+
+    async def _finalize_delete(self, query, user_id, week_number):
+        """Фоновое удаление отчёта из Sheets и итоговое сообщение"""
+        try:
+            success = await asyncio.get_running_loop().run_in_executor(
+                self._sheets_pool, self.sheets_manager.delete_week_report, week_number
             )
-            
+
             if success:
-                keyboard = [
-                    [InlineKeyboardButton("📝 Новый отчёт", callback_data="new_report")],
-                    [InlineKeyboardButton("🗑️ Удалить ещё отчёт", callback_data="delete_report")],
-                    [InlineKeyboardButton("📊 Перейти в таблицу", url=self.sheet_url)]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                await query.edit_message_text(
+                _clear_sheets_cache()
+                reply_markup = self._kb_post_delete
+
+                await self._safe_edit(query, 
                     f"✅ Отчёт за неделю {week_number} успешно удалён!\n\n"
                     "Выберите следующее действие:",
                     reply_markup=reply_markup
                 )
-                
+
                 self.user_states.reset_user_data(user_id)
+                self.user_states.flush(user_id)
             else:
-                await query.edit_message_text(f"❌ Ошибка при удалении отчёта за неделю {week_number}.")
+                await self._safe_edit(query, f"❌ Ошибка при удалении отчёта за неделю {week_number}.")
         except Exception as e:
-            print(f"Error confirming delete: {e}")
-            await query.edit_message_text("❌ Ошибка при удалении отчёта.")
+            log.exception("Error finalizing delete")
+            try:
+                await self._safe_edit(query, "❌ Ошибка при удалении отчёта.")
+            except Exception:
+                pass
     
-    async def _handle_open_sheet(self, query, user_id):
+    async def _handle_open_sheet(self, query, user_id, user_data):
         """Обработка открытия таблицы"""
-        await query.edit_message_text(
+        await self._safe_edit(query, 
             f"📊 [Открыть таблицу]({self.sheet_url})",
             parse_mode='Markdown'
         )
     
-    async def _handle_edit_report(self, query, user_id):
+    async def _handle_edit_report(self, query, user_id, user_data):
         """Обработка редактирования отчёта"""
         try:
-            keyboard = [
-                [InlineKeyboardButton("📅 Номер недели", callback_data="edit_week")],
-                [InlineKeyboardButton("⭐ Оценка", callback_data="edit_rating")],
-                [InlineKeyboardButton("✅ Выполненные задачи", callback_data="edit_completed")],
-                [InlineKeyboardButton("🎯 Планируемые задачи", callback_data="edit_planned")],
-                [InlineKeyboardButton("💬 Комментарий", callback_data="edit_comment")],
-                [InlineKeyboardButton("◀️ Назад", callback_data="back")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = self._kb_edit_sections
             
-            await query.edit_message_text(
+            await self._safe_edit(query, 
                 "✏️ Что хотите изменить?",
                 reply_markup=reply_markup
             )
         except Exception as e:
-            print(f"Error in edit report: {e}")
+            log.exception("Error in edit report")
     
-    async def _handle_add_more_tasks(self, query, user_id):
+    async def _handle_add_more_tasks(self, query, user_id, user_data):
         """Добавление дополнительных задач"""
-        await query.edit_message_text("➕ Напишите следующую выполненную задачу:")
+        await self._safe_edit(query, "➕ Напишите следующую выполненную задачу:")
     
-    async def _handle_edit_task(self, query, user_id):
+    async def _handle_edit_task(self, query, user_id, user_data):
         """Редактирование задач"""
         try:
-            user_data = self.user_states.get_user_data(user_id)
             
             if not user_data.planned_tasks:
-                await query.edit_message_text("📝 Нет задач для редактирования.")
+                await self._safe_edit(query, "📝 Нет задач для редактирования.")
                 return
             
             keyboard = []
@@ -530,183 +799,136 @@ class BotHandlers:
             keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data="back")])
             
             reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.edit_message_text(
+            await self._safe_edit(query, 
                 "✏️ Выберите задачу для редактирования:",
                 reply_markup=reply_markup
             )
         except Exception as e:
-            print(f"Error in edit task: {e}")
+            log.exception("Error in edit task")
     
-    async def _handle_edit_specific_task(self, query, user_id, data):
+    async def _handle_edit_specific_task(self, query, user_id, task_index, user_data):
         """Редактирование конкретной задачи"""
         try:
-            task_index = int(data.split("_")[2])
-            user_data = self.user_states.get_user_data(user_id)
             
             if task_index < len(user_data.planned_tasks):
                 user_data.editing_task_index = task_index
                 self.user_states.set_state(user_id, BotState.EDITING_TASK)
                 
-                await query.edit_message_text(
+                await self._safe_edit(query, 
                     f"✏️ Текущая задача: {user_data.planned_tasks[task_index]}\n\n"
                     "Напишите новый текст задачи:"
                 )
         except Exception as e:
-            print(f"Error in edit specific task: {e}")
+            log.exception("Error in edit specific task")
     
-    async def _handle_edit_section(self, query, user_id, data):
+    async def _handle_edit_section(self, query, user_id, data, user_data):
         """Редактирование секции отчёта"""
         try:
-            section = data.split("_")[1]
-            user_data = self.user_states.get_user_data(user_id)
-            
-            if section == "week":
-                self.user_states.set_state(user_id, BotState.WAITING_FOR_WEEK_NUMBER)
-                keyboard = [[InlineKeyboardButton("◀️ Назад", callback_data="back")]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                await query.edit_message_text("📅 Введите новый номер недели:", reply_markup=reply_markup)
-            elif section == "rating":
-                keyboard = []
-                row = []
-                for i in range(1, 11):
-                    row.append(InlineKeyboardButton(str(i), callback_data=f"rating_{i}"))
-                    if len(row) == 5:
-                        keyboard.append(row)
-                        row = []
-                if row:
-                    keyboard.append(row)
-                keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data="back")])
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                await query.edit_message_text("⭐ Выберите новую оценку:", reply_markup=reply_markup)
-            elif section == "comment":
-                self.user_states.set_state(user_id, BotState.WAITING_FOR_COMMENT)
-                keyboard = [[InlineKeyboardButton("◀️ Назад", callback_data="back")]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                await query.edit_message_text("💬 Введите новый комментарий:", reply_markup=reply_markup)
-            elif section == "completed":
-                # Редактирование выполненных задач
-                current_tasks = "\n".join([f"{i+1}. {task}" for i, task in enumerate(user_data.completed_tasks)]) or "Нет выполненных задач"
-                
-                keyboard = [
-                    [InlineKeyboardButton("➕ Добавить задачу", callback_data="add_completed_task")],
-                    [InlineKeyboardButton("🗑️ Удалить задачу", callback_data="remove_completed_task")],
-                    [InlineKeyboardButton("◀️ Назад", callback_data="back")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                await query.edit_message_text(
-                    f"✅ **Текущие выполненные задачи:**\n\n{current_tasks}\n\nВыберите действие:",
-                    reply_markup=reply_markup,
-                    parse_mode='Markdown'
-                )
-            elif section == "incomplete":
-                # Редактирование невыполненных задач
-                current_tasks = "\n".join([f"{i+1}. {task}" for i, task in enumerate(user_data.incomplete_tasks)]) or "Нет невыполненных задач"
-                
-                keyboard = [
-                    [InlineKeyboardButton("➕ Добавить задачу", callback_data="add_incomplete_task")],
-                    [InlineKeyboardButton("🗑️ Удалить задачу", callback_data="remove_incomplete_task")],
-                    [InlineKeyboardButton("◀️ Назад", callback_data="back")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                await query.edit_message_text(
-                    f"❌ **Текущие невыполненные задачи:**\n\n{current_tasks}\n\nВыберите действие:",
-                    reply_markup=reply_markup,
-                    parse_mode='Markdown'
-                )
-            elif section == "planned":
-                # Редактирование планируемых задач
-                current_tasks = "\n".join([f"{i+1}. {task}" for i, task in enumerate(user_data.planned_tasks)]) or "Нет запланированных задач"
-                
-                keyboard = [
-                    [InlineKeyboardButton("➕ Добавить задачу", callback_data="add_planned_task")],
-                    [InlineKeyboardButton("🗑️ Удалить задачу", callback_data="remove_planned_task")],
-                    [InlineKeyboardButton("◀️ Назад", callback_data="back")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                await query.edit_message_text(
-                    f"🎯 **Текущие запланированные задачи:**\n\n{current_tasks}\n\nВыберите действие:",
-                    reply_markup=reply_markup,
-                    parse_mode='Markdown'
-                )
+            section = data[len("edit_"):]
+            handler = self._edit_section_handlers.get(section)
+            if handler:
+                await handler(query, user_id, user_data)
         except Exception as e:
-            print(f"Error in edit section: {e}")
+            log.exception("Error in edit section")
+
+    async def _edit_section_week(self, query, user_id, user_data):
+        self.user_states.set_state(user_id, BotState.WAITING_FOR_WEEK_NUMBER)
+        reply_markup = self._kb_back_only
+        await self._safe_edit(query, "📅 Введите новый номер недели:", reply_markup=reply_markup)
+
+    async def _edit_section_rating(self, query, user_id, user_data):
+        reply_markup = _RATING_GRID
+        await self._safe_edit(query, "⭐ Выберите новую оценку:", reply_markup=reply_markup)
+
+    async def _edit_section_comment(self, query, user_id, user_data):
+        self.user_states.set_state(user_id, BotState.WAITING_FOR_COMMENT)
+        reply_markup = self._kb_back_only
+        await self._safe_edit(query, "💬 Введите новый комментарий:", reply_markup=reply_markup)
+
+    async def _edit_section_completed(self, query, user_id, user_data):
+        await self._show_task_list_menu(query, "completed", user_data.completed_tasks,
+                                        "✅", "выполненные", "Нет выполненных задач")
+
+    async def _edit_section_incomplete(self, query, user_id, user_data):
+        await self._show_task_list_menu(query, "incomplete", user_data.incomplete_tasks,
+                                        "❌", "невыполненные", "Нет невыполненных задач")
+
+    async def _edit_section_planned(self, query, user_id, user_data):
+        await self._show_task_list_menu(query, "planned", user_data.planned_tasks,
+                                        "🎯", "запланированные", "Нет запланированных задач")
+
+    async def _show_task_list_menu(self, query, task_type, tasks, icon, title, empty_text):
+        """Показать список задач секции с меню добавления/удаления"""
+        current_tasks = "\n".join([f"{i+1}. {task}" for i, task in enumerate(tasks)]) or empty_text
+
+        reply_markup = self._kb_edit_tasks[task_type]
+
+        await self._safe_edit(query, 
+            f"{icon} **Текущие {title} задачи:**\n\n{current_tasks}\n\nВыберите действие:",
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
     
     async def message_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик текстовых сообщений"""
+        user_id = update.effective_user.id
         try:
-            user_id = update.effective_user.id
             user_data = self.user_states.get_user_data(user_id)
             text = update.message.text.strip()
-            
-            if user_data.state == BotState.WAITING_FOR_WEEK_NUMBER:
-                await self._handle_week_number(update, user_id, text)
-            elif user_data.state == BotState.ADDING_ADDITIONAL_TASKS:
-                await self._handle_additional_task(update, user_id, text)
-            elif user_data.state == BotState.ADDING_PLANNED_TASKS:
-                await self._handle_planned_task(update, user_id, text)
-            elif user_data.state == BotState.WAITING_FOR_COMMENT:
-                await self._handle_comment(update, user_id, text)
-            elif user_data.state == BotState.EDITING_TASK:
-                await self._handle_task_edit(update, user_id, text)
+
+            handler = self._msg_dispatch.get(user_data.state)
+            if handler:
+                await handler(update, user_id, text, user_data)
             else:
-                await update.message.reply_text("👋 Нажмите /start для начала работы!")
+                await self._safe_reply(update.message, "👋 Нажмите /start для начала работы!")
         except Exception as e:
-            print(f"Error in message handler: {e}")
-            await update.message.reply_text("❌ Произошла ошибка. Попробуйте ещё раз.")
+            log.exception("Error in message handler")
+            await self._safe_reply(update.message, "❌ Произошла ошибка. Попробуйте ещё раз.")
+        finally:
+            self.user_states.flush(user_id)
     
-    async def _handle_week_number(self, update, user_id, text):
+    async def _handle_week_number(self, update, user_id, text, user_data):
         """Обработка номера недели"""
         try:
             week_number = int(text)
             if week_number <= 0:
-                await update.message.reply_text("⚠️ Номер недели должен быть больше 0.")
+                await self._safe_reply(update.message, "⚠️ Номер недели должен быть больше 0.")
                 return
             
-            user_data = self.user_states.get_user_data(user_id)
             user_data.week_number = week_number
+            user_data.mark_dirty()
             
-            keyboard = []
-            row = []
-            for i in range(1, 11):
-                row.append(InlineKeyboardButton(str(i), callback_data=f"rating_{i}"))
-                if len(row) == 5:
-                    keyboard.append(row)
-                    row = []
-            if row:
-                keyboard.append(row)
-            keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data="back")])
-            
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = _RATING_GRID
             self.user_states.set_state(user_id, BotState.WAITING_FOR_RATING)
             
-            await update.message.reply_text(
+            await self._safe_reply(update.message, 
                 f"📅 Неделя {week_number}\n\n⭐ Оцените неделю от 1 до 10:",
                 reply_markup=reply_markup
             )
         except ValueError:
-            await update.message.reply_text("⚠️ Введите корректный номер недели (число).")
+            await self._safe_reply(update.message, "⚠️ Введите корректный номер недели (число).")
         except Exception as e:
-            print(f"Error in week number handler: {e}")
+            log.exception("Error in week number handler")
     
-    async def _handle_additional_task(self, update, user_id, text):
+    async def _handle_additional_task(self, update, user_id, text, user_data):
         """Обработка дополнительных задач"""
         try:
-            user_data = self.user_states.get_user_data(user_id)
             
             # Проверяем, редактируем ли мы невыполненные задачи
             if hasattr(user_data, 'current_task_input') and user_data.current_task_input == "incomplete":
                 user_data.incomplete_tasks.append(text)
+                user_data.incomplete_tasks_set.add(text)
+                user_data.mark_dirty()
                 user_data.current_task_input = None  # Сбрасываем флаг
                 
                 # В режиме редактирования показываем предварительный просмотр
                 temp_query = self._create_temp_query(update)
-                await self._show_report_preview(temp_query, user_id)
+                await self._show_report_preview(temp_query, user_id, user_data)
             else:
                 # Обычная логика для выполненных задач
                 user_data.completed_tasks.append(text)
+                user_data.completed_tasks_set.add(text)
+                user_data.mark_dirty()
                 
                 # Проверяем, в режиме редактирования или создания отчета
                 if user_data.state == BotState.EDITING_REPORT:
@@ -719,20 +941,15 @@ class BotHandlers:
                             await self.message.reply_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
                     
                     temp_query = TempQuery(update)
-                    await self._show_report_preview(temp_query, user_id)
+                    await self._show_report_preview(temp_query, user_id, user_data)
                 else:
                     # Обычный режим создания отчета
-                    keyboard = [
-                        [InlineKeyboardButton("➕ Добавить ещё", callback_data="add_more_tasks")],
-                        [InlineKeyboardButton("➡️ Далее", callback_data="next_step")],
-                        [InlineKeyboardButton("◀️ Назад", callback_data="back")]
-                    ]
-                    reply_markup = InlineKeyboardMarkup(keyboard)
+                    reply_markup = self._kb_add_more
                     
                     # Формируем список всех выполненных задач с правильными символами
                     tasks_list = []
                     for task in user_data.completed_tasks:
-                        if task in user_data.previous_planned_tasks:
+                        if task in user_data.previous_planned_set:
                             # Планово выполненная задача
                             symbol = "✓ ✶" if task == user_data.priority_task else "✓"
                         else:
@@ -747,96 +964,87 @@ class BotHandlers:
                     
                     tasks_display = "\n".join(tasks_list)
                     
-                    await update.message.reply_text(
+                    await self._safe_reply(update.message, 
                         f"📋 Задачи:\n{tasks_display}\n\n➕ Что дальше?",
                         reply_markup=reply_markup
                     )
         except Exception as e:
-            print(f"Error in additional task handler: {e}")
+            log.exception("Error in additional task handler")
     
-    async def _handle_planned_task(self, update, user_id, text):
+    async def _handle_planned_task(self, update, user_id, text, user_data):
         """Обработка запланированных задач"""
         try:
-            user_data = self.user_states.get_user_data(user_id)
             user_data.planned_tasks.append(text)
+            user_data.mark_dirty()
             
             # Проверяем, в режиме редактирования или создания отчета
             if user_data.state == BotState.EDITING_REPORT:
                 # В режиме редактирования показываем предварительный просмотр
                 temp_query = self._create_temp_query(update)
-                await self._show_report_preview(temp_query, user_id)
+                await self._show_report_preview(temp_query, user_id, user_data)
             else:
                 # Обычный режим создания отчета
-                keyboard = [
-                    [InlineKeyboardButton("➡️ Далее", callback_data="next_step")],
-                    [InlineKeyboardButton("✏️ Изменить задачу", callback_data="edit_task")],
-                    [InlineKeyboardButton("◀️ Назад", callback_data="back")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
+                reply_markup = self._kb_next_edit_back
                 
                 # Формируем список всех запланированных задач
                 tasks_list = "\n".join([f"• {task}" for task in user_data.planned_tasks])
                 
-                await update.message.reply_text(
+                await self._safe_reply(update.message, 
                     f"📝 Запланированные задачи:\n{tasks_list}\n\n🎯 Что дальше?",
                     reply_markup=reply_markup
                 )
         except Exception as e:
-            print(f"Error in planned task handler: {e}")
+            log.exception("Error in planned task handler")
     
-    async def _handle_comment(self, update, user_id, text):
+    async def _handle_comment(self, update, user_id, text, user_data):
         """Обработка комментария"""
         try:
-            user_data = self.user_states.get_user_data(user_id)
             user_data.comment = text
+            user_data.mark_dirty()
             
             # Проверяем, в режиме редактирования или создания отчета
             if user_data.state == BotState.EDITING_REPORT:
                 # В режиме редактирования показываем предварительный просмотр
                 temp_query = self._create_temp_query(update)
-                await self._show_report_preview(temp_query, user_id)
+                await self._show_report_preview(temp_query, user_id, user_data)
             else:
                 # Обычный режим создания отчета - показываем предварительный просмотр
                 temp_query = self._create_temp_query(update)
-                await self._show_report_preview(temp_query, user_id)
+                await self._show_report_preview(temp_query, user_id, user_data)
         except Exception as e:
-            print(f"Error in comment handler: {e}")
+            log.exception("Error in comment handler")
     
-    async def _handle_task_edit(self, update, user_id, text):
+    async def _handle_task_edit(self, update, user_id, text, user_data):
         """Обработка редактирования задачи"""
         try:
-            user_data = self.user_states.get_user_data(user_id)
             
             if user_data.editing_task_index is not None:
                 user_data.planned_tasks[user_data.editing_task_index] = text
                 user_data.editing_task_index = None
+                user_data.mark_dirty()
                 
                 self.user_states.set_state(user_id, BotState.ADDING_PLANNED_TASKS)
                 
-                keyboard = [
-                    [InlineKeyboardButton("➡️ Далее", callback_data="next_step")],
-                    [InlineKeyboardButton("✏️ Изменить задачу", callback_data="edit_task")],
-                    [InlineKeyboardButton("◀️ Назад", callback_data="back")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
+                reply_markup = self._kb_next_edit_back
                 
-                await update.message.reply_text(
+                await self._safe_reply(update.message, 
                     f"✅ Задача изменена: {text}\n\n🎯 Что дальше?",
                     reply_markup=reply_markup
                 )
         except Exception as e:
-            print(f"Error in task edit handler: {e}")
+            log.exception("Error in task edit handler")
     
-    async def _handle_edit_existing_report(self, query, user_id):
+    async def _handle_edit_existing_report(self, query, user_id, user_data):
         """Обработка изменения существующего отчёта"""
         try:
             # Получаем все номера недель
-            week_numbers = await asyncio.get_event_loop().run_in_executor(
-                None, self.sheets_manager.get_all_week_numbers
+            week_numbers = await self._single_flight(
+                ("weeks",), _cached_week_numbers, self.sheets_manager,
+                int(monotonic() // _SHEETS_TTL)
             )
             
             if not week_numbers:
-                await query.edit_message_text(
+                await self._safe_edit(query, 
                     "📄 Нет отчётов для изменения.\n\n"
                     "Создайте первый отчёт!",
                     reply_markup=InlineKeyboardMarkup([
@@ -854,26 +1062,25 @@ class BotHandlers:
             reply_markup = InlineKeyboardMarkup(keyboard)
             self.user_states.set_state(user_id, BotState.EDITING_REPORT)
             
-            await query.edit_message_text(
+            await self._safe_edit(query, 
                 "✏️ Выберите неделю для изменения:",
                 reply_markup=reply_markup
             )
         except Exception as e:
-            print(f"Error in edit existing report: {e}")
-            await query.edit_message_text("❌ Ошибка при получении списка отчётов.")
+            log.exception("Error in edit existing report")
+            await self._safe_edit(query, "❌ Ошибка при получении списка отчётов.")
     
-    async def _handle_edit_week_selection(self, query, user_id, data):
+    async def _handle_edit_week_selection(self, query, user_id, week_number, user_data):
         """Обработка выбора недели для редактирования"""
         try:
-            week_number = int(data.split("_")[2])
             
             # Получаем данные отчета за выбранную неделю
-            report_data = await asyncio.get_event_loop().run_in_executor(
-                None, self.sheets_manager.get_week_report, week_number
+            report_data = await asyncio.get_running_loop().run_in_executor(
+                self._sheets_pool, self.sheets_manager.get_week_report, week_number
             )
             
             if not report_data:
-                await query.edit_message_text(
+                await self._safe_edit(query, 
                     f"❌ Отчет за неделю {week_number} не найден.",
                     reply_markup=InlineKeyboardMarkup([
                         [InlineKeyboardButton("◀️ Назад", callback_data="edit_existing_report")]
@@ -882,13 +1089,14 @@ class BotHandlers:
                 return
             
             # Загружаем данные в состояние пользователя
-            user_data = self.user_states.get_user_data(user_id)
             user_data.week_number = report_data['week_number']
             user_data.rating = report_data['rating']
             user_data.completed_tasks = [task.strip() for task in report_data['completed_tasks'] if task.strip()]
             user_data.incomplete_tasks = [task.strip() for task in report_data['incomplete_tasks'] if task.strip()]
             user_data.planned_tasks = [task.strip() for task in report_data['planned_tasks'] if task.strip()]
             user_data.comment = report_data['comment']
+            user_data.rebuild_task_sets()
+            user_data.mark_dirty()
             
             # Показываем меню редактирования отчета
             keyboard = [
@@ -908,62 +1116,51 @@ class BotHandlers:
             incomplete_section = "\n".join([f"- {task}" for task in user_data.incomplete_tasks]) or "Нет невыполненных задач"
             planned_section = "\n".join([f"☐ {task}" for task in user_data.planned_tasks]) or "Нет запланированных задач"
             
-            report_preview = f"""✏️ **РЕДАКТИРОВАНИЕ ОТЧЕТА ЗА НЕДЕЛЮ {week_number}**
-
-📊 **Текущие данные:**
-📅 Неделя: {user_data.week_number}
-⭐ Оценка: {user_data.rating}/10
-
-📋 **Выполненные задачи:**
-{completed_section}
-
-❌ **Невыполненные задачи:**
-{incomplete_section}
-
-🎯 **Планируемые задачи:**
-{planned_section}
-
-💬 **Комментарий:** {user_data.comment or "Нет комментария"}
-
-Выберите, что хотите изменить:"""
+            report_preview = _EDIT_PREVIEW_TPL.format(
+                week=week_number,
+                week_number=user_data.week_number,
+                rating=user_data.rating,
+                completed=completed_section,
+                incomplete=incomplete_section,
+                planned=planned_section,
+                comment=user_data.comment or "Нет комментария"
+            )
             
             self.user_states.set_state(user_id, BotState.EDITING_REPORT)
             
-            await query.edit_message_text(
+            await self._safe_edit(query, 
                 report_preview,
                 reply_markup=reply_markup,
                 parse_mode='Markdown'
             )
         except Exception as e:
-            print(f"Error in edit week selection: {e}")
-            await query.edit_message_text("❌ Ошибка при загрузке отчета для редактирования.")
+            log.exception("Error in edit week selection")
+            await self._safe_edit(query, "❌ Ошибка при загрузке отчета для редактирования.")
     
-    async def _handle_add_task_for_edit(self, query, user_id, data):
+    async def _handle_add_task_for_edit(self, query, user_id, data, user_data):
         """Обработка добавления задачи при редактировании"""
         try:
-            task_type = data.split("_")[1]  # completed, incomplete, planned
+            task_type = data[len("add_"):-len("_task")]  # completed, incomplete, planned
             
             # Устанавливаем соответствующее состояние
             if task_type == "completed":
                 self.user_states.set_state(user_id, BotState.ADDING_ADDITIONAL_TASKS)
-                await query.edit_message_text("✅ Введите новую выполненную задачу:")
+                await self._safe_edit(query, "✅ Введите новую выполненную задачу:")
             elif task_type == "incomplete":
                 # Создаем новое состояние для добавления невыполненных задач
                 self.user_states.set_state(user_id, BotState.ADDING_ADDITIONAL_TASKS)  # Переиспользуем состояние
-                user_data = self.user_states.get_user_data(user_id)
                 user_data.current_task_input = "incomplete"  # Помечаем тип
-                await query.edit_message_text("❌ Введите новую невыполненную задачу:")
+                await self._safe_edit(query, "❌ Введите новую невыполненную задачу:")
             elif task_type == "planned":
                 self.user_states.set_state(user_id, BotState.ADDING_PLANNED_TASKS)
-                await query.edit_message_text("🎯 Введите новую запланированную задачу:")
+                await self._safe_edit(query, "🎯 Введите новую запланированную задачу:")
         except Exception as e:
-            print(f"Error in add task for edit: {e}")
+            log.exception("Error in add task for edit")
     
-    async def _handle_remove_task_for_edit(self, query, user_id, data):
+    async def _handle_remove_task_for_edit(self, query, user_id, data, user_data):
         """Обработка удаления задачи при редактировании"""
         try:
-            task_type = data.split("_")[1]  # completed, incomplete, planned
-            user_data = self.user_states.get_user_data(user_id)
+            task_type = data[len("remove_"):-len("_task")]  # completed, incomplete, planned
             
             # Определяем список задач для удаления
             if task_type == "completed":
@@ -982,7 +1179,7 @@ class BotHandlers:
                 return
             
             if not tasks:
-                await query.edit_message_text(
+                await self._safe_edit(query, 
                     f"❌ Нет задач для удаления в категории '{task_name}'.",
                     reply_markup=InlineKeyboardMarkup([
                         [InlineKeyboardButton("◀️ Назад", callback_data="back")]
@@ -997,69 +1194,67 @@ class BotHandlers:
             keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data="back")])
             
             reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.edit_message_text(
+            await self._safe_edit(query, 
                 f"{emoji} Выберите {task_name} задачу для удаления:",
                 reply_markup=reply_markup
             )
         except Exception as e:
-            print(f"Error in remove task for edit: {e}")
+            log.exception("Error in remove task for edit")
     
-    async def _handle_specific_task_removal(self, query, user_id, data):
+    async def _handle_specific_task_removal(self, query, user_id, data, user_data):
         """Обработка удаления конкретной задачи"""
         try:
             # Парсим данные: remove_completed_task_0, remove_incomplete_task_1, etc.
-            parts = data.split("_")
-            task_type = parts[1]  # completed, incomplete, planned
-            task_index = int(parts[3])  # индекс задачи
+            task_type, _, index_str = data[len("remove_"):].partition("_task_")
+            task_index = int(index_str)  # индекс задачи
             
-            user_data = self.user_states.get_user_data(user_id)
             
             # Определяем список и удаляем задачу
             if task_type == "completed" and task_index < len(user_data.completed_tasks):
                 removed_task = user_data.completed_tasks.pop(task_index)
+                user_data.completed_tasks_set.discard(removed_task)
                 task_name = "выполненная"
             elif task_type == "incomplete" and task_index < len(user_data.incomplete_tasks):
                 removed_task = user_data.incomplete_tasks.pop(task_index)
+                user_data.incomplete_tasks_set.discard(removed_task)
                 task_name = "невыполненная"
             elif task_type == "planned" and task_index < len(user_data.planned_tasks):
                 removed_task = user_data.planned_tasks.pop(task_index)
                 task_name = "запланированная"
             else:
-                await query.edit_message_text("❌ Ошибка: задача не найдена.")
+                await self._safe_edit(query, "❌ Ошибка: задача не найдена.")
                 return
+            user_data.mark_dirty()
             
             # Возвращаемся к меню редактирования этого типа задач
-            await query.edit_message_text(
+            await self._safe_edit(query, 
                 f"✅ {task_name.capitalize()} задача '{removed_task}' удалена!",
                 reply_markup=InlineKeyboardMarkup([
                     [InlineKeyboardButton("◀️ Назад к редактированию", callback_data=f"edit_{task_type}")]
                 ])
             )
         except Exception as e:
-            print(f"Error in specific task removal: {e}")
-            await query.edit_message_text("❌ Ошибка при удалении задачи.")
+            log.exception("Error in specific task removal")
+            await self._safe_edit(query, "❌ Ошибка при удалении задачи.")
     
-    async def _show_report_preview(self, query, user_id):
+    async def _show_report_preview(self, query, user_id, user_data):
         """Показать предварительный просмотр отчёта"""
         try:
-            user_data = self.user_states.get_user_data(user_id)
-            report_preview = format_report_message(user_data)
+            if user_data.cached_report_text is None:
+                user_data.cached_report_text = format_report_message(user_data)
+            report_preview = user_data.cached_report_text
             
-            keyboard = [
-                [InlineKeyboardButton("✅ Подтвердить", callback_data="confirm_report")],
-                [InlineKeyboardButton("✏️ Изменить", callback_data="edit_report")],
-                [InlineKeyboardButton("◀️ Назад", callback_data="back")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = self._kb_confirm_preview
             
             self.user_states.set_state(user_id, BotState.CONFIRMING_REPORT)
             
-            await query.edit_message_text(
+            await self._safe_edit(
+                query,
                 f"📊 Предварительный отчёт:\n\n{report_preview}\n\n✅ Подтвердить?",
                 reply_markup=reply_markup
             )
         except Exception as e:
-            print(f"Error in show report preview: {e}")
+            log.exception("Error in show report preview")
     
     def _create_temp_query(self, update):
         """Создать временный query объект для использования с функциями, требующими query"""
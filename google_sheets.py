@@ -1,59 +1,222 @@
+import logging
 import os
 import json
+import random
 import re
+import threading
+import time
 from datetime import datetime
+from functools import cached_property, lru_cache
+import httplib2
 from google.auth.transport.requests import Request
 from google.oauth2.service_account import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from typing import List, Dict, Optional
 
+logger = logging.getLogger(__name__)
+
+# Время жизни кэша чтений: повторные обращения в рамках одного диалога
+# идут из памяти, а не в Google (и не тратят квоту запросов)
+CACHE_TTL = 30
+
+# Файл-маркер «шапка таблицы уже записана»: проверка нужна максимум один
+# раз за жизнь листа, маркер избавляет от неё и после перезапуска
+HEADERS_MARKER_PATH = os.getenv('HEADERS_MARKER_PATH', '.headers_ok')
+
+# Скомпилирован один раз при импорте — вызывается по 2-3 раза на строку листа
+_NON_DIGIT_RE = re.compile(r"\D+")
+
+
+@lru_cache(maxsize=1)
+def _load_credentials():
+    """Разобрать GOOGLE_CREDENTIALS один раз на процесс
+
+    Учётные данные общие для всех экземпляров менеджера: повторный
+    json.loads и пересоздание ключей при каждом инстансе не нужны.
+    """
+    creds_json = os.getenv('GOOGLE_CREDENTIALS')
+    if not creds_json:
+        raise ValueError("GOOGLE_CREDENTIALS environment variable not set")
+
+    return Credentials.from_service_account_info(json.loads(creds_json))
+
+# Русские названия месяцев для формата даты отчёта
+_RU_MONTHS = (
+    "января", "февраля", "марта", "апреля", "мая", "июня",
+    "июля", "августа", "сентября", "октября", "ноября", "декабря"
+)
+
 class GoogleSheetsManager:
     def __init__(self):
-        self.credentials = self._get_credentials()
         self.sheet_id = os.getenv('GOOGLE_SHEET_ID')
-        self.service = build('sheets', 'v4', credentials=self.credentials)
-        self.sheet = self.service.spreadsheets()
-    
-    def _get_credentials(self):
-        creds_json = os.getenv('GOOGLE_CREDENTIALS')
-        if not creds_json:
-            raise ValueError("GOOGLE_CREDENTIALS environment variable not set")
-        
-        creds_dict = json.loads(creds_json)
-        return Credentials.from_service_account_info(creds_dict)
+        # TTL-кэш чтений по диапазону; сбрасывается при любой мутации листа
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        self._headers_written = os.path.exists(HEADERS_MARKER_PATH)
+        # httplib2.Http не потокобезопасен — соединение держим на поток
+        self._local = threading.local()
+
+    @cached_property
+    def credentials(self):
+        return _load_credentials()
+
+    def _authorized_http(self):
+        """Авторизованное http-соединение текущего потока
+
+        Keep-alive сохраняется (TCP+TLS не переустанавливаются на каждый
+        запрос), но каждый поток пула работает через своё соединение:
+        общий httplib2.Http при параллельных вызовах перемешивает ответы.
+        """
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=10))
+            self._local.http = http
+        return http
+
+    @cached_property
+    def service(self):
+        """Клиент Sheets API; строится лениво при первом обращении к API"""
+        # static_discovery: описание API берётся из пакета, без HTTP-запроса
+        # за discovery-документом при каждом старте
+        return build('sheets', 'v4', http=self._authorized_http(),
+                     cache_discovery=False, static_discovery=True)
+
+    @cached_property
+    def sheet(self):
+        return self.service.spreadsheets()
     
+    # Статусы, при которых запрос имеет смысл повторить
+    _RETRIABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def _exec(self, request, tries: int = 5):
+        """Выполнить запрос к API с экспоненциальным backoff
+
+        Повторяются rate-limit и серверные ошибки (429/5xx), а также
+        обрывы соединения: транзиентный сбой превращается в короткое
+        ожидание, а не в потерянный отчёт."""
+        # http передаётся явно: запрос, созданный сервисом, иначе пошёл бы
+        # через соединение потока, в котором сервис был построен
+        http = self._authorized_http()
+        for attempt in range(tries):
+            try:
+                return request.execute(http=http)
+            except HttpError as e:
+                if e.resp.status in self._RETRIABLE_STATUSES and attempt < tries - 1:
+                    time.sleep((2 ** attempt) * 0.5 + random.random() * 0.25)
+                    continue
+                raise
+            except (ConnectionError, TimeoutError, OSError):
+                if attempt < tries - 1:
+                    time.sleep((2 ** attempt) * 0.5 + random.random() * 0.25)
+                    continue
+                raise
+
     def _format_date_russian(self, dt):
         """Форматирование даты в русском формате"""
-        months = [
-            "января", "февраля", "марта", "апреля", "мая", "июня",
-            "июля", "августа", "сентября", "октября", "ноября", "декабря"
-        ]
-        day = dt.day
-        month = months[dt.month - 1]
-        year = dt.year
-        time = dt.strftime('%H:%M')
-        return f"{day} {month} {year}, {time}"
+        return f"{dt.day} {_RU_MONTHS[dt.month - 1]} {dt.year}, {dt.hour:02d}:{dt.minute:02d}"
     
     def _clean_week_number(self, week_str: str) -> str:
         """Очистка номера недели от лишних символов"""
         if not week_str:
             return ""
         # Убираем все нечисловые символы (пробелы, точки и т.д.)
-        cleaned = re.sub(r"[^0-9]", "", str(week_str))
-        print(f"🧹 _clean_week_number: '{week_str}' -> '{cleaned}' (длина: {len(week_str)} -> {len(cleaned)})")
-        return cleaned
+        return _NON_DIGIT_RE.sub("", str(week_str))
     
+    def _cached_get(self, range_: str, ttl: float = CACHE_TTL):
+        """Чтение диапазона с TTL-кэшем по ключу диапазона"""
+        now = time.monotonic()
+        with self._cache_lock:
+            entry = self._cache.get(range_)
+            if entry and now - entry[0] < ttl:
+                return entry[1]
+        result = self._exec(self.sheet.values().get(
+            spreadsheetId=self.sheet_id,
+            range=range_
+        ))
+        with self._cache_lock:
+            self._cache[range_] = (now, result)
+        return result
+
+    def _invalidate_cache(self):
+        """Сбросить кэш чтений после успешной записи или удаления"""
+        with self._cache_lock:
+            self._cache.clear()
+
+    def _fetch_all(self):
+        """Получить заголовок и все строки отчётов одним batchGet-запросом"""
+        now = time.monotonic()
+        with self._cache_lock:
+            entry = self._cache.get('A1:G1+A:G')
+            if entry and now - entry[0] < CACHE_TTL:
+                result = entry[1]
+            else:
+                result = None
+        if result is None:
+            result = self._exec(self.sheet.values().batchGet(
+                spreadsheetId=self.sheet_id,
+                ranges=['A1:G1', 'A:G']
+            ))
+            with self._cache_lock:
+                self._cache['A1:G1+A:G'] = (now, result)
+        value_ranges = result.get('valueRanges', [])
+        header = value_ranges[0].get('values', []) if len(value_ranges) > 0 else []
+        rows = value_ranges[1].get('values', []) if len(value_ranges) > 1 else []
+        return header, rows
+
+    def _week_index_from_rows(self, rows: List[List[str]]) -> Dict[int, tuple]:
+        """Построить индекс {номер недели: (номер строки листа, запланированные задачи)}"""
+        index = {}
+        for i, row in enumerate(rows[1:], start=2):  # Данные начинаются со строки 2
+            cleaned = self._clean_week_number(self._safe_get_cell(row, 1))
+            if cleaned.isdigit():
+                index[int(cleaned)] = (i, self._safe_get_cell(row, 5))
+        return index
+
+    def _get_week_index(self) -> Dict[int, tuple]:
+        """Индекс недель по кэшированным данным листа (O(1) поиск недели)"""
+        now = time.monotonic()
+        with self._cache_lock:
+            entry = self._cache.get('week_index')
+            if entry and now - entry[0] < CACHE_TTL:
+                return entry[1]
+        # Для индекса достаточно колонок B (неделя) и F (запланированные
+        # задачи) — полный A:G тянул бы впятеро больше байт.
+        # majorDimension=COLUMNS отдаёт каждую колонку плоским списком
+        # вместо списка одноэлементных строк
+        result = self._exec(self.sheet.values().batchGet(
+            spreadsheetId=self.sheet_id,
+            ranges=['WeeklyReports!B:B', 'WeeklyReports!F:F'],
+            majorDimension='COLUMNS'
+        ))
+        value_ranges = result.get('valueRanges', [])
+        weeks = value_ranges[0].get('values', [[]]) if len(value_ranges) > 0 else [[]]
+        planned = value_ranges[1].get('values', [[]]) if len(value_ranges) > 1 else [[]]
+        weeks = weeks[0] if weeks else []
+        planned = planned[0] if planned else []
+        index = {}
+        for i in range(1, len(weeks)):  # Пропускаем заголовок
+            cleaned = self._clean_week_number(weeks[i])
+            if cleaned.isdigit():
+                planned_cell = planned[i] if i < len(planned) else ""
+                index[int(cleaned)] = (i + 1, planned_cell)
+        with self._cache_lock:
+            self._cache['week_index'] = (time.monotonic(), index)
+        return index
+
     def _safe_get_cell(self, row: List[str], index: int) -> str:
         """Безопасное получение ячейки из строки"""
-        try:
-            if index < len(row):
-                return row[index] if row[index] is not None else ""
-            return ""
-        except (IndexError, TypeError):
-            return ""
+        # Проверка длины уже исключает IndexError — try/except здесь лишний
+        value = row[index] if index < len(row) else ""
+        return value if value is not None else ""
     
-    def get_previous_week_tasks(self, week_number: int) -> List[str]:
-        """Получить планируемые задачи из предыдущей недели"""
+    def get_previous_week_tasks(self, week_number: int, debug: bool = False) -> List[str]:
+        """Получить планируемые задачи из предыдущей недели
+
+        С debug=True дополнительно собирается перечень всех недель таблицы
+        для диагностической сводки — в горячем пути он не нужен.
+        """
         debug_info = {
             'total_checks': 0,
             'week_found': False,
@@ -64,162 +227,58 @@ class GoogleSheetsManager:
             'all_weeks_found': [],
             'errors': []
         }
-        
+
         try:
-            print(f"🔍 [ДИАГНОСТИКА] Ищем задачи для недели {week_number}, предыдущая неделя: {week_number - 1}")
-            debug_info['target_week'] = week_number - 1
+            prev_week = week_number - 1
+            debug_info['target_week'] = prev_week
             debug_info['total_checks'] += 1
-            
+
             if week_number <= 1:
                 debug_info['errors'].append("Неделя <= 1")
-                print("⚠️ [ДИАГНОСТИКА] Неделя <= 1, возвращаем пустой список")
                 self._save_debug_info(debug_info)
                 return []
-            
-            # Специфичный запрос к листу WeeklyReports
-            range_name = 'WeeklyReports!A:G'
-            print(f"📊 [ДИАГНОСТИКА] Запрашиваем данные из диапазона: {range_name}")
-            
-            result = self.sheet.values().get(
-                spreadsheetId=self.sheet_id,
-                range=range_name
-            ).execute()
-            debug_info['total_checks'] += 1
-            
-            values = result.get('values', [])
-            debug_info['rows_total'] = len(values)
-            print(f"📊 [ДИАГНОСТИКА] Получено строк из таблицы: {len(values)}")
-            
-            if not values:
-                debug_info['errors'].append("Таблица пустая")
-                print("❌ [ДИАГНОСТИКА] Таблица пустая")
+
+            # Поиск по индексу недель вместо построчного сканирования
+            index = self._get_week_index()
+            debug_info['rows_analyzed'] = len(index)
+            if debug:
+                debug_info['all_weeks_found'] = [
+                    {'row': i, 'original': str(week), 'cleaned': str(week), 'as_int': week}
+                    for week, (i, _) in index.items()
+                ]
+
+            entry = index.get(prev_week)
+            if entry is None:
+                debug_info['errors'].append(f"Неделя {prev_week} не найдена")
                 self._save_debug_info(debug_info)
                 return []
-            
-            # Показываем заголовки для отладки
-            if len(values) > 0:
-                debug_info['headers'] = values[0]
-                print(f"📋 [ДИАГНОСТИКА] Заголовки: {values[0]}")
-                # Проверяем правильность заголовков
-                expected_headers = ['Дата и время отчёта', 'Номер недели', 'Оценка недели', 'Сделанные задачи', 'Не сделанные задачи', 'Запланированные задачи', 'Комментарий']
-                if len(values[0]) >= 6:
-                    print(f"📋 [ДИАГНОСТИКА] Колонка F (индекс 5): '{values[0][5] if len(values[0]) > 5 else 'ОТСУТСТВУЕТ'}'")
-            
-            prev_week = week_number - 1
-            print(f"🎯 [ДИАГНОСТИКА] Ищем неделю: '{prev_week}'")
-            
-            # Показываем все данные для диагностики
-            print(f"🔍 [ДИАГНОСТИКА] Всего строк для анализа: {len(values) - 1}")
-            debug_info['rows_analyzed'] = len(values) - 1
-            
-            # ПЕРВЫЙ ПРОХОД: Собираем все номера недель для анализа
-            print(f"🔍 [ДИАГНОСТИКА] === ПЕРВЫЙ ПРОХОД: Анализ всех недель в таблице ===")
-            for i, row in enumerate(values[1:], 1):
-                week_cell = self._safe_get_cell(row, 1)
-                cleaned_week = self._clean_week_number(week_cell)
-                if cleaned_week:
-                    debug_info['all_weeks_found'].append({
-                        'row': i,
-                        'original': week_cell,
-                        'cleaned': cleaned_week,
-                        'as_int': int(cleaned_week) if cleaned_week.isdigit() else None
-                    })
-            
-            print(f"🔍 [ДИАГНОСТИКА] Найдены следующие недели в таблице:")
-            for week_info in debug_info['all_weeks_found']:
-                print(f"   Строка {week_info['row']}: '{week_info['original']}' -> '{week_info['cleaned']}' -> {week_info['as_int']}")
-            
-            # ВТОРОЙ ПРОХОД: Детальный поиск нужной недели
-            print(f"🔍 [ДИАГНОСТИКА] === ВТОРОЙ ПРОХОД: Поиск недели {prev_week} ===")
-            
-            for i, row in enumerate(values[1:], 1):  # Пропускаем заголовок
-                debug_info['total_checks'] += 1
-                
-                # Безопасно получаем номер недели
-                week_cell = self._safe_get_cell(row, 1)  # Колонка B (индекс 1)
-                cleaned_week = self._clean_week_number(week_cell)
-                
-                # Показываем содержимое всей строки для диагностики
-                print(f"📄 [ДИАГНОСТИКА] Строка {i}: {row}")
-                print(f"   Неделя RAW: '{week_cell}' (длина: {len(week_cell)}, тип: {type(week_cell)})")
-                print(f"   Неделя CLEAN: '{cleaned_week}' (длина: {len(cleaned_week)})")
-                print(f"   Ищем: '{prev_week}' (тип: {type(prev_week)})")
-                
-                # Множественные варианты сравнения
-                string_match = cleaned_week == str(prev_week)
-                int_match = cleaned_week.isdigit() and int(cleaned_week) == prev_week
-                contains_match = str(prev_week) in cleaned_week
-                
-                print(f"   Проверки: string_match={string_match}, int_match={int_match}, contains_match={contains_match}")
-                
-                # Сохраняем близкие совпадения
-                if contains_match or abs(int(cleaned_week) - prev_week) <= 1 if cleaned_week.isdigit() else False:
-                    debug_info['close_matches'].append({
-                        'row': i,
-                        'week_cell': week_cell,
-                        'cleaned': cleaned_week,
-                        'row_data': row[:6]  # Первые 6 колонок
-                    })
-                
-                # Улучшенное сравнение
-                week_matches = string_match or int_match
-                
-                if week_matches:
-                    debug_info['week_found'] = True
-                    debug_info['exact_matches'].append({'row': i, 'data': row})
-                    print(f"✅ [ДИАГНОСТИКА] НАЙДЕНА СТРОКА для недели {prev_week}!")
-                    
-                    # Безопасно получаем запланированные задачи из колонки F (индекс 5)
-                    planned_tasks_cell = self._safe_get_cell(row, 5)
-                    print(f"📝 [ДИАГНОСТИКА] Колонка F (индекс 5, запланированные задачи):")
-                    print(f"   RAW: '{planned_tasks_cell}'")
-                    print(f"   Длина: {len(planned_tasks_cell)}")
-                    print(f"   Тип: {type(planned_tasks_cell)}")
-                    print(f"   После strip(): '{planned_tasks_cell.strip()}'")
-                    print(f"   Булево значение: {bool(planned_tasks_cell and planned_tasks_cell.strip())}")
-                    
-                    if planned_tasks_cell and planned_tasks_cell.strip():
-                        debug_info['data_found'] = True
-                        # Разделяем задачи по переносам строки
-                        planned_tasks = planned_tasks_cell.split('\n')
-                        clean_tasks = [task.strip() for task in planned_tasks if task.strip()]
-                        print(f"🎯 [ДИАГНОСТИКА] УСПЕХ! Найденные задачи: {clean_tasks}")
-                        debug_info['found_tasks'] = clean_tasks
-                        self._save_debug_info(debug_info)
-                        return clean_tasks
-                    else:
-                        debug_info['errors'].append(f"Колонка F пустая в строке {i}")
-                        print("❌ [ДИАГНОСТИКА] Колонка F пустая или содержит только пробелы")
-            
-            # Финальная диагностика
-            print(f"❌ [ДИАГНОСТИКА] === ФИНАЛЬНЫЙ РЕЗУЛЬТАТ ===")
-            print(f"   Искали неделю: {prev_week}")
-            print(f"   Всего проверок: {debug_info['total_checks']}")
-            print(f"   Строк проанализировано: {debug_info['rows_analyzed']}")
-            print(f"   Неделя найдена: {debug_info['week_found']}")
-            print(f"   Данные найдены: {debug_info['data_found']}")
-            print(f"   Точные совпадения: {len(debug_info['exact_matches'])}")
-            print(f"   Близкие совпадения: {len(debug_info['close_matches'])}")
-            
-            if debug_info['close_matches']:
-                print(f"🔍 [ДИАГНОСТИКА] Близкие совпадения (возможные проблемы форматирования):")
-                for match in debug_info['close_matches']:
-                    print(f"   Строка {match['row']}: '{match['week_cell']}' -> '{match['cleaned']}'")
-            
+
+            row_number, planned_tasks_cell = entry
+            debug_info['week_found'] = True
+            debug_info['exact_matches'].append({'row': row_number, 'data': planned_tasks_cell})
+
+            if not planned_tasks_cell.strip():
+                debug_info['errors'].append(f"Колонка F пустая в строке {row_number}")
+                self._save_debug_info(debug_info)
+                return []
+
+            debug_info['data_found'] = True
+            clean_tasks = [task.strip() for task in planned_tasks_cell.split('\n') if task.strip()]
+            debug_info['found_tasks'] = clean_tasks
             self._save_debug_info(debug_info)
-            return []
-            
+            return clean_tasks
+
         except Exception as e:
             debug_info['errors'].append(f"Exception: {str(e)}")
-            print(f"💥 [ДИАГНОСТИКА] Ошибка при получении задач: {e}")
+            logger.exception("Ошибка при получении задач предыдущей недели")
             self._save_debug_info(debug_info)
             return []
-    
+
     def _save_debug_info(self, debug_info):
         """Сохранить диагностическую информацию для отображения пользователю"""
         # Сохраняем в переменную класса для доступа из других методов
         self.last_debug_info = debug_info
-        print(f"💾 [ДИАГНОСТИКА] Информация сохранена: {len(debug_info)} ключей")
+        logger.debug("Диагностика сохранена: %d ключей", len(debug_info))
     
     def get_last_debug_summary(self) -> str:
         """Получить краткую сводку последней диагностики"""
@@ -249,115 +308,126 @@ class GoogleSheetsManager:
     def get_all_week_numbers(self) -> List[int]:
         """Получить все номера недель из таблицы"""
         try:
-            result = self.sheet.values().get(
+            # Колонка без заголовка одним списком и числа без форматирования:
+            # меньше байт в ответе и никакой построчной очистки строк
+            now = time.monotonic()
+            cache_key = 'week_numbers'
+            with self._cache_lock:
+                entry = self._cache.get(cache_key)
+                if entry and now - entry[0] < CACHE_TTL:
+                    return entry[1]
+
+            result = self._exec(self.sheet.values().get(
                 spreadsheetId=self.sheet_id,
-                range='WeeklyReports!B:B'
-            ).execute()
-            
-            values = result.get('values', [])
-            if not values:
-                return []
-            
-            week_numbers = []
-            for row in values[1:]:  # Пропускаем заголовок
-                week_cell = self._safe_get_cell(row, 0)
-                cleaned_week = self._clean_week_number(week_cell)
-                
-                if cleaned_week and cleaned_week.isdigit():
-                    week_numbers.append(int(cleaned_week))
-            
-            return sorted(list(set(week_numbers)))  # Убираем дубликаты и сортируем
+                range='WeeklyReports!B2:B',
+                majorDimension='COLUMNS',
+                valueRenderOption='UNFORMATTED_VALUE'
+            ))
+            column = result.get('values', [[]])
+            week_numbers = set()
+            for cell in (column[0] if column else []):
+                if isinstance(cell, (int, float)):
+                    week_numbers.add(int(cell))
+                elif isinstance(cell, str):
+                    cleaned_week = _NON_DIGIT_RE.sub("", cell)
+                    if cleaned_week:
+                        week_numbers.add(int(cleaned_week))
+
+            week_numbers = sorted(week_numbers)  # Убираем дубликаты и сортируем
+            with self._cache_lock:
+                self._cache[cache_key] = (now, week_numbers)
+            return week_numbers
         except Exception as e:
-            print(f"Error getting week numbers: {e}")
+            logger.exception("Error getting week numbers")
             return []
     
+    @cached_property
+    def _weekly_sheet_gid(self) -> int:
+        """sheetId листа WeeklyReports — стабилен, достаточно одного запроса"""
+        sheet_metadata = self._exec(self.service.spreadsheets().get(
+            spreadsheetId=self.sheet_id
+        ))
+        for sheet in sheet_metadata['sheets']:
+            if sheet['properties']['title'] == 'WeeklyReports':
+                return sheet['properties']['sheetId']
+        return 0  # Fallback к первому листу
+
     def delete_week_report(self, week_number: int) -> bool:
         """Удалить отчет за указанную неделю"""
         try:
-            print(f"🗑️ [УДАЛЕНИЕ] Удаляем отчет за неделю {week_number}")
-            
-            result = self.sheet.values().get(
-                spreadsheetId=self.sheet_id,
-                range='WeeklyReports!A:G'
-            ).execute()
-            
-            values = result.get('values', [])
-            if not values:
+            logger.debug("Удаляем отчет за неделю %s", week_number)
+
+            # Строка находится по кэшированному индексу недель,
+            # sheetId берётся из закэшированных метаданных
+            entry = self._get_week_index().get(week_number)
+            if entry is None:
                 return False
-            
-            # Находим строку с отчетом за указанную неделю
-            print(f"🔍 [УДАЛЕНИЕ] Анализируем {len(values)-1} строк данных")
-            
-            for i, row in enumerate(values[1:], start=2):  # Начинаем с строки 2
-                week_cell = self._safe_get_cell(row, 1)
-                cleaned_week = self._clean_week_number(week_cell)
-                print(f"📄 [УДАЛЕНИЕ] Строка {i}: неделя '{week_cell}' -> '{cleaned_week}'")
-                
-                # Улучшенное сравнение как в get_previous_week_tasks
-                week_matches = (
-                    cleaned_week == str(week_number) or
-                    (cleaned_week.isdigit() and int(cleaned_week) == week_number)
-                )
-                
-                if week_matches:
-                    print(f"✅ [УДАЛЕНИЕ] Найдена строка {i} для недели {week_number}")
-                    
-                    # Получаем информацию о листе для правильного sheetId
-                    sheet_metadata = self.service.spreadsheets().get(
-                        spreadsheetId=self.sheet_id
-                    ).execute()
-                    
-                    sheet_id = None
-                    for sheet in sheet_metadata['sheets']:
-                        if sheet['properties']['title'] == 'WeeklyReports':
-                            sheet_id = sheet['properties']['sheetId']
-                            break
-                    
-                    if sheet_id is None:
-                        sheet_id = 0  # Fallback к первому листу
-                    
-                    print(f"📊 [УДАЛЕНИЕ] Используем sheetId: {sheet_id}")
-                    
-                    # Удаляем строку
-                    request = {
-                        'requests': [
-                            {
-                                'deleteDimension': {
-                                    'range': {
-                                        'sheetId': sheet_id,
-                                        'dimension': 'ROWS',
-                                        'startIndex': i - 1,
-                                        'endIndex': i
-                                    }
-                                }
+            i = entry[0]
+            logger.debug("Найдена строка %d для недели %s", i, week_number)
+
+            # Удаляем строку
+            request = {
+                'requests': [
+                    {
+                        'deleteDimension': {
+                            'range': {
+                                'sheetId': self._weekly_sheet_gid,
+                                'dimension': 'ROWS',
+                                'startIndex': i - 1,
+                                'endIndex': i
                             }
-                        ]
+                        }
                     }
-                    
-                    self.service.spreadsheets().batchUpdate(
-                        spreadsheetId=self.sheet_id,
-                        body=request
-                    ).execute()
-                    
-                    print(f"✅ [УДАЛЕНИЕ] Успешно удален отчет за неделю {week_number}")
-                    return True
-            
-            return False
+                ]
+            }
+
+            self._exec(self.service.spreadsheets().batchUpdate(
+                spreadsheetId=self.sheet_id,
+                body=request
+            ))
+            self._invalidate_cache()
+
+            logger.info("Удален отчет за неделю %s", week_number)
+            return True
         except Exception as e:
-            print(f"Error deleting week report: {e}")
+            logger.exception("Error deleting week report")
             return False
     
+    def _mark_headers_written(self):
+        """Запомнить (и пережить перезапуск), что шапка уже на месте"""
+        if not self._headers_written:
+            self._headers_written = True
+            try:
+                with open(HEADERS_MARKER_PATH, 'w'):
+                    pass
+            except OSError:
+                pass
+
+    def _seed_week_cache(self, week_number: int, row_number: int,
+                         planned_str: str, base_index: Dict[int, tuple]):
+        """Положить только что записанную строку в индекс недель
+
+        Следующий get_previous_week_tasks(week + 1) находит её в памяти,
+        не перечитывая лист. base_index — снимок индекса до записи:
+        после _invalidate_cache кэш пуст, и без него опубликованный
+        индекс состоял бы из одной свежей недели."""
+        index = dict(base_index)
+        index[week_number] = (row_number, planned_str)
+        with self._cache_lock:
+            self._cache['week_index'] = (time.monotonic(), index)
+
     def save_report(self, week_number: int, completed_tasks: List[str], 
                    incomplete_tasks: List[str], planned_tasks: List[str], 
                    comment: str, rating: int) -> bool:
         """Сохранить отчет в Google Sheets"""
         try:
             # Подготовка данных для записи с русским форматом даты
+            # ('\n'.join пустого списка сам по себе даёт пустую строку)
             date_str = self._format_date_russian(datetime.now())
-            completed_str = '\n'.join(completed_tasks) if completed_tasks else ''
-            incomplete_str = '\n'.join(incomplete_tasks) if incomplete_tasks else ''
-            planned_str = '\n'.join(planned_tasks) if planned_tasks else ''
-            comment_str = comment if comment else ''
+            completed_str = '\n'.join(completed_tasks)
+            incomplete_str = '\n'.join(incomplete_tasks)
+            planned_str = '\n'.join(planned_tasks)
+            comment_str = comment or ''
             
             # Порядок данных согласно заголовкам таблицы:
             # A: Дата и время отчёта
@@ -377,148 +447,163 @@ class GoogleSheetsManager:
                 comment_str         # G: Комментарий
             ]]
             
-            print(f"📅 Saving report with date: {date_str}")
-            
-            # Проверяем, есть ли заголовки
-            result = self.sheet.values().get(
-                spreadsheetId=self.sheet_id,
-                range='A1:G1'
-            ).execute()
-            
-            if not result.get('values'):
-                # Добавляем заголовки
-                headers = [['Дата и время отчёта', 'Номер недели', 'Оценка недели', 
+            logger.info("Saving report with date: %s", date_str)
+
+            if self._headers_written:
+                # Шапка подтверждена ранее — достаточно индекса недель
+                # (обычно уже в кэше), без полного чтения листа
+                index = self._get_week_index()
+                return self._write_report_row(week_number, values, planned_str, index)
+
+            # Заголовок и все строки забираем одним запросом:
+            # по ним проверяем и наличие шапки, и существование недели
+            header, rows = self._fetch_all()
+
+            if not header:
+                # Шапка и первая строка данных пишутся одним batchUpdate:
+                # одна запись против двух в счёт квоты 60 записей/мин
+                headers = [['Дата и время отчёта', 'Номер недели', 'Оценка недели',
                           'Сделанные задачи', 'Не сделанные задачи', 'Запланированные задачи', 'Комментарий']]
-                self.sheet.values().update(
-                    spreadsheetId=self.sheet_id,
-                    range='A1:G1',
-                    valueInputOption='USER_ENTERED',
-                    body={'values': headers}
-                ).execute()
-                print("✅ Headers added to sheet")
-            
-            # Проверяем, есть ли уже отчет за эту неделю
-            if self.check_week_exists(week_number):
-                # Обновляем существующий отчет
-                self._update_existing_report(week_number, values[0])
-                print(f"✅ Updated report for week {week_number}")
-            else:
-                # Добавляем новый отчет
-                self.sheet.values().append(
+                next_row = max(len(rows) + 1, 2)
+                self._exec(self.sheet.values().batchUpdate(
                     spreadsheetId=self.sheet_id,
-                    range='A:G',
-                    valueInputOption='USER_ENTERED',
-                    insertDataOption='INSERT_ROWS',
-                    body={'values': values}
-                ).execute()
-                print(f"✅ Added new report for week {week_number}")
-            
-            return True
+                    body={
+                        'valueInputOption': 'RAW',
+                        'data': [
+                            {'range': 'A1:G1', 'values': headers},
+                            {'range': f'A{next_row}:G{next_row}', 'values': values},
+                        ]
+                    }
+                ))
+                self._invalidate_cache()
+                self._seed_week_cache(week_number, next_row, planned_str,
+                                      self._week_index_from_rows(rows))
+                self._mark_headers_written()
+                logger.info("Headers and report for week %s written in one batch", week_number)
+                return True
+
+            self._mark_headers_written()
+            index = self._week_index_from_rows(rows)
+            return self._write_report_row(week_number, values, planned_str, index)
         except Exception as e:
-            print(f"Error saving report: {e}")
+            logger.exception("Error saving report")
             return False
+
+    def _write_report_row(self, week_number: int, values: List[List[str]],
+                          planned_str: str, index: Dict[int, tuple]) -> bool:
+        """Записать строку отчёта: обновить существующую неделю или добавить новую"""
+        if self.check_week_exists(week_number, index=index):
+            # Обновляем существующий отчет
+            self._update_existing_report(week_number, values[0], index=index)
+            row_number = index[week_number][0]
+            logger.info("Updated report for week %s", week_number)
+        else:
+            # Добавляем новый отчет
+            result = self._exec(self.sheet.values().append(
+                spreadsheetId=self.sheet_id,
+                range='A:G',
+                valueInputOption='RAW',
+                insertDataOption='INSERT_ROWS',
+                body={'values': values}
+            ))
+            # Номер строки берём из ответа API: вычисление по индексу
+            # ошибается, если в листе есть строки без номера недели
+            updated_range = result.get('updates', {}).get('updatedRange', '')
+            match = re.search(r'!A(\d+)', updated_range)
+            row_number = int(match.group(1)) if match else None
+            logger.info("Added new report for week %s", week_number)
+
+        self._invalidate_cache()
+        if row_number is not None:
+            self._seed_week_cache(week_number, row_number, planned_str, index)
+        return True
     
-    def _update_existing_report(self, week_number: int, new_data: List[str]) -> bool:
+    def _update_existing_report(self, week_number: int, new_data: List[str],
+                                index: Optional[Dict[int, tuple]] = None) -> bool:
         """Обновить существующий отчет"""
         try:
-            result = self.sheet.values().get(
+            if index is None:
+                index = self._get_week_index()
+
+            entry = index.get(week_number)
+            if entry is None:
+                return False
+
+            # Обновляем найденную строку
+            i = entry[0]
+            self._exec(self.sheet.values().update(
                 spreadsheetId=self.sheet_id,
-                range='A:G'
-            ).execute()
-            
-            values = result.get('values', [])
-            
-            # Находим строку с отчетом за указанную неделю
-            for i, row in enumerate(values[1:], start=2):  # Начинаем с строки 2
-                week_cell = self._safe_get_cell(row, 1)
-                cleaned_week = self._clean_week_number(week_cell)
-                
-                if cleaned_week == str(week_number):
-                    # Обновляем строку
-                    range_name = f'A{i}:G{i}'
-                    self.sheet.values().update(
-                        spreadsheetId=self.sheet_id,
-                        range=range_name,
-                        valueInputOption='USER_ENTERED',
-                        body={'values': [new_data]}
-                    ).execute()
-                    return True
-            
-            return False
+                range=f'A{i}:G{i}',
+                valueInputOption='RAW',
+                body={'values': [new_data]}
+            ))
+            self._invalidate_cache()
+            return True
         except Exception as e:
-            print(f"Error updating existing report: {e}")
+            logger.exception("Error updating existing report")
             return False
     
-    def check_week_exists(self, week_number: int) -> bool:
+    def check_week_exists(self, week_number: int,
+                          index: Optional[Dict[int, tuple]] = None) -> bool:
         """Проверить, существует ли уже отчет за эту неделю"""
         try:
-            result = self.sheet.values().get(
-                spreadsheetId=self.sheet_id,
-                range='A:B'
-            ).execute()
-            
-            values = result.get('values', [])
-            for row in values[1:]:  # Пропускаем заголовок
-                week_cell = self._safe_get_cell(row, 1)
-                cleaned_week = self._clean_week_number(week_cell)
-                
-                if cleaned_week == str(week_number):
-                    return True
-            return False
+            if index is None:
+                index = self._get_week_index()
+            return week_number in index
         except Exception as e:
-            print(f"Error checking week existence: {e}")
+            logger.exception("Error checking week existence")
             return False
     
     def get_week_report(self, week_number: int) -> Optional[Dict]:
         """Получить отчет за указанную неделю"""
         try:
-            result = self.sheet.values().get(
-                spreadsheetId=self.sheet_id,
-                range='WeeklyReports!A:G'
-            ).execute()
+            result = self._cached_get('WeeklyReports!A:G')
             
             values = result.get('values', [])
             if not values:
                 return None
             
-            # Ищем строку с отчетом за указанную неделю
-            for i, row in enumerate(values[1:], start=2):  # Начинаем с строки 2
-                week_cell = self._safe_get_cell(row, 1)
-                cleaned_week = self._clean_week_number(week_cell)
-                
-                # Улучшенное сравнение
-                week_matches = (
-                    cleaned_week == str(week_number) or
-                    (cleaned_week.isdigit() and int(cleaned_week) == week_number)
-                )
-                
-                if week_matches:
+            # Ищем строку с отчетом за указанную неделю.
+            # Инварианты вынесены из цикла: целевая строка считается один раз,
+            # доступ к ячейке — без try/except из _safe_get_cell
+            target = str(week_number)
+            _sub = _NON_DIGIT_RE.sub
+            for row in values[1:]:  # Начинаем с строки 2
+                week_cell = row[1] if len(row) > 1 and row[1] is not None else ''
+                cleaned_week = _sub("", str(week_cell))
+
+                if cleaned_week == target or cleaned_week.lstrip('0') == target:
                     # Возвращаем данные отчета
+                    rating = self._safe_get_cell(row, 2)
+                    completed = self._safe_get_cell(row, 3)
+                    incomplete = self._safe_get_cell(row, 4)
+                    planned = self._safe_get_cell(row, 5)
                     return {
                         'date': self._safe_get_cell(row, 0),
                         'week_number': week_number,
-                        'rating': int(self._safe_get_cell(row, 2)) if self._safe_get_cell(row, 2).isdigit() else 0,
-                        'completed_tasks': self._safe_get_cell(row, 3).split('\n') if self._safe_get_cell(row, 3) else [],
-                        'incomplete_tasks': self._safe_get_cell(row, 4).split('\n') if self._safe_get_cell(row, 4) else [],
-                        'planned_tasks': self._safe_get_cell(row, 5).split('\n') if self._safe_get_cell(row, 5) else [],
+                        'rating': int(rating) if rating.isdigit() else 0,
+                        'completed_tasks': completed.split('\n') if completed else [],
+                        'incomplete_tasks': incomplete.split('\n') if incomplete else [],
+                        'planned_tasks': planned.split('\n') if planned else [],
                         'comment': self._safe_get_cell(row, 6)
                     }
             
             return None
         except Exception as e:
-            print(f"Error getting week report: {e}")
+            logger.exception("Error getting week report")
             return None
 
     def clear_sheet(self) -> bool:
         """Очистить все данные (кроме заголовков) - для отладки"""
         try:
             # Очищаем все данные начиная со второй строки
-            self.sheet.values().clear(
+            self._exec(self.sheet.values().clear(
                 spreadsheetId=self.sheet_id,
                 range='A2:G1000'
-            ).execute()
-            print("✅ Sheet cleared")
+            ))
+            self._invalidate_cache()
+            logger.info("Sheet cleared")
             return True
         except Exception as e:
-            print(f"Error clearing sheet: {e}")
+            logger.exception("Error clearing sheet")
             return False
@@ -1,6 +1,26 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from dataclasses import dataclass, field, fields
+from typing import List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Ограничения хранилища состояний, чтобы память не росла бесконечно
+MAX_USERS = 10_000
+IDLE_TIMEOUT = 3600  # секунд без активности до удаления состояния
+
+# Поля UserData, которые не имеет смысла сохранять между перезапусками
+# (set-дубликаты списков задач восстанавливаются из самих списков)
+_TRANSIENT_FIELDS = ('last_touched', 'cached_report_text',
+                     'completed_tasks_set', 'incomplete_tasks_set',
+                     'previous_planned_set', 'last_task_keyboard')
 
 class BotState(Enum):
     WAITING_FOR_WEEK_NUMBER = "waiting_for_week_number"
@@ -16,7 +36,7 @@ class BotState(Enum):
     DELETING_REPORT = "deleting_report"
     CONFIRMING_DELETE = "confirming_delete"
 
-@dataclass
+@dataclass(slots=True)
 class UserData:
     state: Optional[BotState] = None
     week_number: Optional[int] = None
@@ -31,19 +51,140 @@ class UserData:
     current_task_input: Optional[str] = None
     delete_week_number: Optional[int] = None
     previous_state: Optional[BotState] = None
+    last_touched: float = field(default_factory=time.monotonic)
+    cached_report_text: Optional[str] = None
+    # Set-дубликаты списков задач для O(1) проверок принадлежности;
+    # сами списки сохраняют порядок для отчёта
+    completed_tasks_set: Set[str] = field(default_factory=set)
+    incomplete_tasks_set: Set[str] = field(default_factory=set)
+    previous_planned_set: Set[str] = field(default_factory=set)
+    # Последняя построенная клавиатура выбора задач (для точечного обновления)
+    last_task_keyboard: Optional[list] = None
+
+    def mark_dirty(self):
+        """Сбросить закэшированный текст отчёта после изменения данных"""
+        self.cached_report_text = None
+
+    def rebuild_task_sets(self):
+        """Синхронизировать set-дубликаты со списками задач"""
+        self.completed_tasks_set = set(self.completed_tasks)
+        self.incomplete_tasks_set = set(self.incomplete_tasks)
+        self.previous_planned_set = set(self.previous_planned_tasks)
+
+# Поля, которые сохраняются в SQLite: всё, кроме транзиентных
+_PERSISTED_FIELDS = tuple(
+    f.name for f in fields(UserData) if f.name not in _TRANSIENT_FIELDS
+)
 
 class UserStates:
-    def __init__(self):
-        self.users: Dict[int, UserData] = {}
-    
+    def __init__(self, max_users: int = MAX_USERS, idle_timeout: float = IDLE_TIMEOUT,
+                 db_path: Optional[str] = None):
+        self.users: "OrderedDict[int, UserData]" = OrderedDict()
+        self.max_users = max_users
+        self.idle_timeout = idle_timeout
+        self._last_sweep = time.monotonic()
+        # SQLite-хранилище, чтобы перезапуск не терял незавершённые отчёты
+        self.db_path = db_path or os.getenv('STATE_DB_PATH', 'user_states.db')
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        # Одно соединение на два потока: доступ сериализуется замком,
+        # а сама запись уходит в выделенный поток, не задерживая event loop
+        self._db_lock = threading.Lock()
+        self._io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='state-db')
+        with self._db_lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS user_states (user_id INTEGER PRIMARY KEY, data TEXT)"
+            )
+            self._conn.commit()
+
     def get_user_data(self, user_id: int) -> UserData:
+        self._sweep_idle()
         if user_id not in self.users:
-            self.users[user_id] = UserData()
-        return self.users[user_id]
-    
+            self.users[user_id] = self._load(user_id) or UserData()
+            # Вытесняем самого давнего пользователя при превышении лимита
+            if len(self.users) > self.max_users:
+                self.users.popitem(last=False)
+        else:
+            self.users.move_to_end(user_id)
+        user_data = self.users[user_id]
+        user_data.last_touched = time.monotonic()
+        return user_data
+
+    def flush(self, user_id: int):
+        """Сохранить состояние пользователя в SQLite
+
+        Сериализация выполняется сразу (снимок текущего состояния),
+        запись и commit — в фоновом потоке, чтобы не блокировать loop."""
+        user_data = self.users.get(user_id)
+        if user_data is None:
+            return
+        try:
+            payload = self._serialize(user_data)
+        except (TypeError, ValueError):
+            logger.exception("Error serializing user state %s", user_id)
+            return
+        self._io_pool.submit(self._write, user_id, payload)
+
+    def _write(self, user_id: int, payload: str):
+        try:
+            with self._db_lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO user_states (user_id, data) VALUES (?, ?)",
+                    (user_id, payload)
+                )
+                self._conn.commit()
+        except sqlite3.Error:
+            logger.exception("Error flushing user state %s", user_id)
+
+    def _load(self, user_id: int) -> Optional[UserData]:
+        try:
+            with self._db_lock:
+                row = self._conn.execute(
+                    "SELECT data FROM user_states WHERE user_id = ?", (user_id,)
+                ).fetchone()
+        except sqlite3.Error:
+            logger.exception("Error loading user state %s", user_id)
+            return None
+        if not row:
+            return None
+        try:
+            return self._deserialize(row[0])
+        except (ValueError, TypeError, KeyError):
+            return None
+
+    @staticmethod
+    def _serialize(user_data: UserData) -> str:
+        # Только сохраняемые поля: asdict() глубоко копировал бы и
+        # транзиентные (включая клавиатуру из PTB-объектов)
+        data = {name: getattr(user_data, name) for name in _PERSISTED_FIELDS}
+        data['state'] = user_data.state.value if user_data.state else None
+        data['previous_state'] = user_data.previous_state.value if user_data.previous_state else None
+        return json.dumps(data, ensure_ascii=False)
+
+    @staticmethod
+    def _deserialize(raw: str) -> UserData:
+        data = json.loads(raw)
+        if data.get('state'):
+            data['state'] = BotState(data['state'])
+        if data.get('previous_state'):
+            data['previous_state'] = BotState(data['previous_state'])
+        user_data = UserData(**data)
+        user_data.rebuild_task_sets()
+        return user_data
+
+    def _sweep_idle(self):
+        """Удалить состояния пользователей, неактивных дольше idle_timeout"""
+        now = time.monotonic()
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        for user_id in list(self.users):
+            if now - self.users[user_id].last_touched > self.idle_timeout:
+                del self.users[user_id]
+
     def reset_user_data(self, user_id: int):
         self.users[user_id] = UserData()
-    
+        self.users.move_to_end(user_id)
+
     def set_state(self, user_id: int, state: BotState):
         user_data = self.get_user_data(user_id)
         user_data.previous_state = user_data.state
@@ -1,6 +1,21 @@
 from states import UserData
 from typing import List
 
+# Шаблон итогового отчёта; собирается один раз при импорте
+_REPORT_TMPL = """#итоги_недели@lifedescription
+
+{week} неделя
+
+1. Состояние: {rating}/10
+
+2. Что было сделано:
+{done}
+
+3. Планы на следующую неделю:
+{planned}
+
+4. Комментарий: {comment}"""
+
 # Кастомные эмоджи для разных типов задач
 CUSTOM_EMOJIS = {
     'planned_next_week': '5330491216804982283',      # Запланированные задачи
@@ -11,82 +26,50 @@ CUSTOM_EMOJIS = {
 
 def format_report_message(user_data: UserData) -> str:
     """Форматирование итогового отчёта с правильными символами и сортировкой"""
-    
-    # Собираем все выполненные/невыполненные задачи с метаданными
+
+    prev_set = user_data.previous_planned_set
+    priority_task = user_data.priority_task
+
+    # Приоритет типов задач для сортировки:
+    # выполненные из планов, невыполненные, дополнительные выполненные
+    PLANNED_DONE, UNDONE, ADDITIONAL_DONE = 1, 2, 3
+
+    # Один проход по каждому списку: (не приоритетная, ранг типа, текст)
     all_completed_tasks = []
-    
-    # Планово выполненные задачи (из previous_planned_tasks)
     for task in user_data.completed_tasks:
-        if task in user_data.previous_planned_tasks:
-            is_priority = task == user_data.priority_task
+        is_priority = task == priority_task
+        if task in prev_set:
             symbol = "✓ ✶" if is_priority else "✓"
-            all_completed_tasks.append({
-                'text': f"{symbol} {task}",
-                'is_priority': is_priority,
-                'type': 'planned_done'
-            })
-    
-    # Дополнительно сделанные задачи (не было в планах)
-    for task in user_data.completed_tasks:
-        if task not in user_data.previous_planned_tasks:
-            is_priority = task == user_data.priority_task
+            rank = PLANNED_DONE
+        else:
             symbol = "+ ✶" if is_priority else "+"
-            all_completed_tasks.append({
-                'text': f"{symbol} {task}",
-                'is_priority': is_priority,
-                'type': 'additional_done'
-            })
-    
-    # Невыполненные задачи (из планов, но не сделанные)
+            rank = ADDITIONAL_DONE
+        all_completed_tasks.append((not is_priority, rank, f"{symbol} {task}"))
+
     for task in user_data.incomplete_tasks:
-        is_priority = task == user_data.priority_task
+        is_priority = task == priority_task
         symbol = "- ✶" if is_priority else "-"
-        all_completed_tasks.append({
-            'text': f"{symbol} {task}",
-            'is_priority': is_priority,
-            'type': 'undone'
-        })
-    
-    # Определяем приоритет типов задач для сортировки
-    type_priority = {
-        'planned_done': 1,      # Выполненные из планов
-        'undone': 2,           # Невыполненные 
-        'additional_done': 3   # Дополнительные выполненные
-    }
-    
-    # Сортируем: сначала приоритетные (независимо от типа), потом по типу
-    all_completed_tasks.sort(key=lambda x: (not x['is_priority'], type_priority.get(x['type'], 999)))
-    completed_section = [item['text'] for item in all_completed_tasks]
-    
-    # Формируем планируемые задачи с правильной сортировкой
+        all_completed_tasks.append((not is_priority, UNDONE, f"{symbol} {task}"))
+
+    # Сортируем: сначала приоритетные (независимо от типа), потом по типу;
+    # текст в ключ не входит — внутри группы сохраняется исходный порядок
+    all_completed_tasks.sort(key=lambda item: item[:2])
+
+    # Планируемые задачи: приоритетные сначала
     all_planned_tasks = []
     for task in user_data.planned_tasks:
-        is_priority = task == user_data.priority_task
+        is_priority = task == priority_task
         symbol = "☐ ✶" if is_priority else "☐"
-        all_planned_tasks.append({
-            'text': f"{symbol} {task}",
-            'is_priority': is_priority
-        })
-    
-    # Сортируем планируемые: приоритетные сначала
-    all_planned_tasks.sort(key=lambda x: not x['is_priority'])
-    planned_section = [item['text'] for item in all_planned_tasks]
-    
-    report = f"""#итоги_недели@lifedescription
-
-{user_data.week_number} неделя
-
-1. Состояние: {user_data.rating}/10
-
-2. Что было сделано:
-{chr(10).join(completed_section) if completed_section else "Нет выполненных задач"}
-
-3. Планы на следующую неделю:
-{chr(10).join(planned_section) if planned_section else "Нет запланированных задач"}
+        all_planned_tasks.append((not is_priority, f"{symbol} {task}"))
+    all_planned_tasks.sort(key=lambda item: item[0])
 
-4. Комментарий: {user_data.comment or "Нет комментария"}"""
-    
-    return report
+    return _REPORT_TMPL.format(
+        week=user_data.week_number,
+        rating=user_data.rating,
+        done="\n".join(item[2] for item in all_completed_tasks) or "Нет выполненных задач",
+        planned="\n".join(item[1] for item in all_planned_tasks) or "Нет запланированных задач",
+        comment=user_data.comment or "Нет комментария"
+    )
 
 def validate_week_number(week_str: str) -> tuple[bool, int]:
     """Проверка корректности номера недели"""